@@ -0,0 +1,170 @@
+import argparse
+import json
+import math
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from landmarks import LandmarkIndex
+
+# Search strategies that can be benchmarked, and the stores they need
+STRATEGIES = [
+    "bidirectional", "single-ended", "landmarks", "components", "costars"
+]
+BACKENDS = ["dict", "compact", "snapshot"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading and searching a Degrees dataset."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS,
+                        choices=BACKENDS)
+    parser.add_argument("--strategies", nargs="+", default=["bidirectional"],
+                        choices=STRATEGIES)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true",
+                        help="print one JSON object per run")
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        for strategy in args.strategies:
+            if backend == "dict" and strategy not in ["bidirectional",
+                                                      "single-ended"]:
+                continue
+            result = run_isolated(args.directory, backend, strategy,
+                                  args.queries, args.seed, args.landmarks)
+            if args.json:
+                print(json.dumps(result), flush=True)
+            else:
+                report(result)
+
+
+def run_isolated(directory, backend, strategy, queries, seed, landmarks):
+    """
+    Runs one benchmark in a fresh process, so that load time and peak
+    memory are not affected by earlier runs.
+    """
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(
+            run, directory, backend, strategy, queries, seed, landmarks
+        ).result()
+
+
+def run(directory, backend, strategy, queries, seed, landmarks):
+    """
+    Loads directory with the given backend, then times random queries
+    with the given strategy. Returns a dict of measurements.
+    """
+    result = {"backend": backend, "strategy": strategy}
+    start = time.perf_counter()
+    degrees.load_data(directory, compact=backend == "compact",
+                      snapshot=backend == "snapshot",
+                      components=strategy == "components",
+                      costars=strategy == "costars")
+    result["load_seconds"] = time.perf_counter() - start
+
+    index = None
+    if strategy == "landmarks":
+        start = time.perf_counter()
+        index = LandmarkIndex.build(degrees.graph, landmarks)
+        result["index_seconds"] = time.perf_counter() - start
+
+    # Every search expands a state by calling its neighbors function once
+    expanded = [0]
+    if degrees.graph is not None:
+        person_ids = degrees.graph.person_ids
+        base = degrees.graph.neighbors
+    else:
+        person_ids = list(degrees.people)
+        base = degrees.neighbors_for_person
+
+    def neighbors(state):
+        expanded[0] += 1
+        return base(state)
+
+    rng = random.Random(seed)
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids))
+             for _ in range(queries)]
+    latencies = []
+    nodes = []
+    connected = 0
+    for source, target in pairs:
+        expanded[0] = 0
+        start = time.perf_counter()
+        path = search(strategy, source, target, neighbors, index)
+        latencies.append(time.perf_counter() - start)
+        nodes.append(expanded[0])
+        connected += path is not None
+
+    result["queries"] = queries
+    result["connected"] = connected
+    result["peak_rss_mb"] = peak_rss() / 2 ** 20
+    result["nodes_expanded_mean"] = sum(nodes) / len(nodes) if nodes else 0
+    result["nodes_expanded_max"] = max(nodes, default=0)
+    for p in [50, 90, 99, 100]:
+        result[f"latency_p{p}_ms"] = percentile(latencies, p) * 1000
+    return result
+
+
+def search(strategy, source, target, neighbors, index):
+    """
+    Runs one query the way `degrees.shortest_path` would for strategy,
+    but through the given neighbors function.
+    """
+    graph = degrees.graph
+    if graph is not None:
+        source = graph.person_index[source]
+        target = graph.person_index[target]
+    if strategy == "single-ended":
+        return degrees.frontier_search(source, target, neighbors)
+    if strategy == "landmarks":
+        lower, upper = index.bounds(source, target)
+        if lower == math.inf:
+            return None
+        return degrees.bidirectional_search(
+            source, target, neighbors, limit=upper,
+            fallback=lambda: index.path(source, target)
+        )
+    if strategy == "components" and not graph.connected(source, target):
+        return None
+    return degrees.bidirectional_search(source, target, neighbors)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def peak_rss():
+    """
+    Returns this process's peak resident set size in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def report(result):
+    print(f"{result['backend']} / {result['strategy']}")
+    print(f"    load:       {result['load_seconds']:.2f} s")
+    if "index_seconds" in result:
+        print(f"    index:      {result['index_seconds']:.2f} s")
+    print(f"    peak RSS:   {result['peak_rss_mb']:.1f} MB")
+    print(f"    connected:  {result['connected']} of {result['queries']}")
+    print(f"    expanded:   {result['nodes_expanded_mean']:.1f} mean, "
+          f"{result['nodes_expanded_max']} max")
+    print("    latency:    " + ", ".join(
+        f"p{p} {result[f'latency_p{p}_ms']:.2f} ms" for p in [50, 90, 99]
+    ) + f", max {result['latency_p100_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
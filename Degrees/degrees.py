@@ -1,7 +1,17 @@
+import argparse
 import csv
+import json
+import math
+import multiprocessing
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from util import Node, StackFrontier
+from graph import (Graph, SNAPSHOT_NAME, csv_fingerprint, delta_fingerprint,
+                   read_delta)
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+from util import Node, PriorityFrontier, SearchStats, StackFrontier, timed
 
 
 # Maps names to a set of corresponding person_ids
@@ -13,11 +23,103 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact graph store, used instead of the dictionaries above when loaded
+graph = None
 
-def load_data(directory):
+# Prefix and fuzzy index over lowercase names, when loaded
+name_index = None
+
+
+def load_data(directory, compact=False, snapshot=False, components=False,
+              name_search=False, deltas=(), costars=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, build an integer-indexed CSR `Graph`
+    instead of filling `names`, `people` and `movies`.
+
+    If `snapshot` is true, also use the compact graph, memory-mapping
+    it from a binary snapshot next to the CSVs when one matches them,
+    and writing that snapshot otherwise.
+
+    If `components` is true, also use the compact graph and label each
+    person with a connected component, storing the labels in the
+    snapshot when one is used.
+
+    If `name_search` is true, also build a `NameIndex` so that
+    `person_id_for_name` can suggest people for partial or misspelled
+    names.
+
+    `deltas` lists delta files (see `apply_delta`) to apply after the
+    CSVs. A snapshot records the deltas folded into it, so only deltas
+    added since it was written are applied again.
+
+    If `costars` is true, also use the compact graph and precompute its
+    deduplicated co-star adjacency (which needs NumPy), so searches
+    expand each co-star once. Pass "all" to keep every shared movie
+    per co-star rather than one representative.
+    """
+    global graph, name_index
+    load_store(directory, compact, snapshot, components, deltas, costars)
+    if name_search:
+        if graph is not None:
+            name_index = NameIndex(zip(graph.person_names, graph.person_ids))
+        else:
+            name_index = NameIndex(
+                (person["name"], person_id)
+                for person_id, person in people.items()
+            )
+
+
+def load_store(directory, compact, snapshot, components, deltas, costars):
     """
+    Fills whichever store `load_data` was asked for.
+    """
+    global graph
+    if snapshot:
+        filename = os.path.join(directory, SNAPSHOT_NAME)
+        base = csv_fingerprint(directory)
+        fingerprint = base + delta_fingerprint(deltas)
+
+        # Reuse a snapshot of the same CSVs with some of the deltas
+        # folded in, applying the rest
+        graph = Graph.from_snapshot(filename)
+        stale = (graph is None or graph.fingerprint is None
+                 or len(graph.fingerprint) < len(base)
+                 or graph.fingerprint != fingerprint[:len(graph.fingerprint)])
+        if stale:
+            graph = Graph.from_csv(directory)
+            graph.fingerprint = base
+        pending = deltas[len(graph.fingerprint) - len(base):]
+        for delta in pending:
+            graph.apply_delta(read_delta(delta))
+
+        missing_costars = costars and (
+            graph.costar_offsets is None
+            or (costars == "all" and graph.costar_all_offsets is None)
+        )
+        if (stale or pending or missing_costars
+                or (components and graph.component is None)):
+            if components and graph.component is None:
+                graph.build_components()
+            if missing_costars:
+                graph.build_costars(keep_all=costars == "all")
+            try:
+                graph.save_snapshot(filename, fingerprint)
+            except OSError:
+                pass
+            graph.fingerprint = fingerprint
+        return
+    if compact or components or costars:
+        graph = Graph.from_csv(directory)
+        for delta in deltas:
+            graph.apply_delta(read_delta(delta))
+        if components:
+            graph.build_components()
+        if costars:
+            graph.build_costars(keep_all=costars == "all")
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,16 +154,135 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    for delta in deltas:
+        apply_records(read_delta(delta))
 
-def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+def apply_delta(filename):
+    """
+    Adds the people, movies and stars in a delta file to the loaded
+    data.
+
+    Each row of the file is `person,id,name,birth`, `movie,id,title,year`
+    or `star,person_id,movie_id`. The name index is updated. Component
+    labels are extended for new people, and a new star that joins two
+    components merges them in place with `Graph.join_components`,
+    relabelling the smaller one. The time is proportional to the size
+    of the delta plus the people relabelled, which amortizes to
+    O(log n) relabels per person over all deltas.
+    """
+    records = read_delta(filename)
+    if graph is not None:
+        added = graph.apply_delta(records)
+        if name_index is not None:
+            for person_id in added:
+                person = graph.person_index[person_id]
+                name_index.add(graph.person_names[person], person_id)
+    else:
+        added = apply_records(records)
+        if name_index is not None:
+            for person_id in added:
+                name_index.add(people[person_id]["name"], person_id)
+
+
+def apply_records(records):
+    """
+    Adds delta records to `names`, `people` and `movies`,
+    returning the ids of people that were added.
+    """
+    added = []
+    for kind, fields in records:
+        if kind == "person":
+            person_id, name, birth = fields
+            if person_id in people:
+                continue
+            people[person_id] = {"name": name, "birth": birth, "movies": set()}
+            names.setdefault(name.lower(), set()).add(person_id)
+            added.append(person_id)
+        elif kind == "movie":
+            movie_id, title, year = fields
+            if movie_id not in movies:
+                movies[movie_id] = {"title": title, "year": year,
+                                    "stars": set()}
+        elif kind == "star":
+            person_id, movie_id = fields
+            if person_id in people and movie_id in movies:
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="use the compact CSR graph store")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the compact graph through a binary "
+                             "snapshot cached next to the CSVs")
+    parser.add_argument("--single-ended", action="store_true",
+                        help="search from the source only")
+    parser.add_argument("--components", action="store_true",
+                        help="label connected components to reject "
+                             "disconnected pairs at once (implies --compact)")
+    parser.add_argument("--name-search", action="store_true",
+                        help="suggest people for partial or misspelled names")
+    parser.add_argument("--costars", action="store_true",
+                        help="precompute deduplicated co-star adjacency "
+                             "(implies --compact, needs NumPy)")
+    parser.add_argument("--delta", action="append", default=[],
+                        metavar="FILE",
+                        help="apply a delta file of new people, movies and "
+                             "stars after loading (repeatable)")
+    parser.add_argument("--landmarks", type=int, metavar="N",
+                        help="build a landmark index from N well-connected "
+                             "people to reject disconnected pairs and cut "
+                             "searches short, or guide A* with "
+                             "--single-ended (implies --compact)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print search statistics to stderr")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a JSON-lines trace of the search")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated source/target pairs "
+                             "from FILE ('-' for stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes used by --batch")
+    args = parser.parse_args()
+    if args.batch:
+        for option in ["landmarks", "name_search", "single_ended", "stats",
+                       "trace"]:
+            if getattr(args, option):
+                flag = "--" + option.replace("_", "-")
+                parser.error(f"{flag} cannot be used with --batch")
+
+    # Load data from files into memory, with the same options that batch
+    # workers load it with
+    options = {
+        "compact": args.compact or bool(args.landmarks),
+        "snapshot": args.snapshot,
+        "components": args.components,
+        "deltas": args.delta,
+        "costars": args.costars
+    }
+    log = sys.stderr if args.batch else sys.stdout
+    print("Loading data...", file=log)
+    load_data(args.directory, name_search=args.name_search, **options)
+    index = None
+    if args.landmarks:
+        index = LandmarkIndex.build(graph, args.landmarks)
+    print("Data loaded.", file=log)
+
+    if args.batch:
+        if args.batch == "-":
+            pairs = read_pairs(sys.stdin)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                pairs = read_pairs(f)
+        for result in run_batch(pairs, args.directory, workers=args.workers,
+                                **options):
+            print(json.dumps(result), flush=True)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -70,7 +291,19 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    stats = None
+    if args.stats or args.trace:
+        trace = open(args.trace, "w", encoding="utf-8") if args.trace else None
+        stats = SearchStats(trace=trace)
+    path = shortest_path(source, target,
+                         bidirectional=not args.single_ended,
+                         landmarks=index, stats=stats)
+    if stats is not None:
+        if stats.trace is not None:
+            stats.write({"event": "summary", **stats.as_dict()})
+            stats.trace.close()
+        if args.stats:
+            print(json.dumps(stats.as_dict()), file=sys.stderr)
 
     if path is None:
         print("Not connected.")
@@ -79,20 +312,196 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_for_id(path[i][1])["name"]
+            person2 = person_for_id(path[i + 1][1])["name"]
+            movie = movie_for_id(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=True, landmarks=None,
+                  stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    By default searches breadth-first from both ends at once; with
+    `bidirectional` false, runs the single-ended frontier search instead.
+    Given a `LandmarkIndex` for the compact graph, rejects pairs it shows
+    are disconnected, and stops the search once the path through a
+    landmark is known to be shortest, or runs A* guided by the index
+    when `bidirectional` is false.
+    Given a `SearchStats`, records the search and its phases in it.
+    """
+    search = bidirectional_search if bidirectional else frontier_search
+    if graph is None:
+        with timed(stats, "search"):
+            return search(source, target, neighbors_for_person, stats)
+
+    with timed(stats, "resolve"):
+        start = graph.person_index[source]
+        goal = graph.person_index[target]
+        if graph.connected(start, goal) is False:
+            return None
+        if landmarks is not None:
+            lower, upper = landmarks.bounds(start, goal)
+            if lower == math.inf:
+                return None
+    with timed(stats, "search"):
+        if landmarks is None:
+            path = search(start, goal, graph.neighbors, stats)
+        elif bidirectional:
+            path = bidirectional_search(
+                start, goal, graph.neighbors, stats, limit=upper,
+                fallback=lambda: landmarks.path(start, goal)
+            )
+        else:
+            path = astar_search(start, goal, graph.neighbors,
+                                landmarks.heuristic(goal), stats)
+    if path is None:
+        return None
+    with timed(stats, "reconstruct"):
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path]
+
+
+def bidirectional_search(source, target, neighbors, stats=None,
+                         limit=math.inf, fallback=None):
+    """
+    Breadth-first search grown from both source and target, one whole
+    level at a time, always expanding the smaller of the two frontiers.
+
+    Returns the list of (action, state) pairs from source to target, or
+    None if they are not connected. `neighbors` must be symmetric.
+
+    `limit` may be the length of a path found some other way, which
+    `fallback()` returns. Once the levels searched rule out every shorter
+    path, that one is returned instead of expanding another level.
+    """
+    if source == target:
+        return []
+
+    # Map each reached state to the (action, state) one step closer to
+    # the side it was reached from
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    # Levels expanded from either side; until the sides meet, every path
+    # is longer than depth
+    depth = 0
+    while forward_frontier and backward_frontier:
+        if depth + 1 >= limit:
+            return fallback()
+        depth += 1
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, neighbors,
+                len(backward_frontier), stats
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, neighbors,
+                len(forward_frontier), stats
+            )
+
+        # The first level that reaches the other side holds a shortest path
+        if meeting is not None:
+            solution = []
+            state = meeting
+            while forward[state] is not None:
+                action, parent = forward[state]
+                solution.append((action, state))
+                state = parent
+            solution.reverse()
+            state = meeting
+            while backward[state] is not None:
+                action, state = backward[state]
+                solution.append((action, state))
+            return solution
+
+    return None
+
+
+def astar_search(source, target, neighbors, heuristic, stats=None):
+    """
+    A* search over unit-cost edges with a consistent heuristic.
+
+    Returns the list of (action, state) pairs from source to target,
+    or None if they are not connected.
     """
+    frontier = PriorityFrontier(
+        key=lambda node: node.cost + heuristic(node.state)
+    )
+    frontier.add(Node(state=source, parent=None, action=None))
+    best = {source: 0}
+    explored = set()
+
+    while not frontier.empty():
+        node = frontier.remove()
+        if stats is not None:
+            stats.membership_checks += 1
+        if node.state in explored:
+            continue
+
+        if node.state == target:
+            solution = []
+            while node.parent is not None:
+                solution.append((node.action, node.state))
+                node = node.parent
+            solution.reverse()
+            return solution
 
+        explored.add(node.state)
+        if stats is not None:
+            stats.expand(node.state, len(frontier))
+
+        cost = node.cost + 1
+        for action, state in neighbors(node.state):
+            if stats is not None:
+                stats.membership_checks += 2
+            if state not in explored and cost < best.get(state, cost + 1):
+                best[state] = cost
+                frontier.add(Node(state=state, parent=node, action=action,
+                                  cost=cost))
+
+    return None
+
+
+def expand_level(frontier, parents, other_parents, neighbors, other_size=0,
+                 stats=None):
+    """
+    Expands every state in frontier, recording new states in parents.
+
+    Returns the next frontier and the first state that was already
+    reached from the other side, or None.
+    """
+    next_frontier = []
+    for i, state in enumerate(frontier):
+        if stats is not None:
+            stats.expand(state, len(frontier) - i + len(next_frontier)
+                         + other_size)
+        for action, neighbor in neighbors(state):
+            if stats is not None:
+                stats.membership_checks += 1
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (action, state)
+            if stats is not None:
+                stats.membership_checks += 1
+            if neighbor in other_parents:
+                return next_frontier, neighbor
+            next_frontier.append(neighbor)
+    return next_frontier, None
+
+
+def frontier_search(source, target, neighbors, stats=None):
+    """
+    Searches from source to target, expanding states with `neighbors`,
+    and returns the list of (action, state) pairs that reach target.
+    """
     solution = []
     explored = set()
     start = Node(state=source, parent=None, action=None)
@@ -122,8 +531,12 @@ def shortest_path(source, target):
             return solution
 
         explored.add(node.state)
+        if stats is not None:
+            stats.expand(node.state, len(frontier))
 
-        for movie_id, person_id in neighbors_for_person(node.state):
+        for movie_id, person_id in neighbors(node.state):
+            if stats is not None:
+                stats.membership_checks += 2
             if not frontier.contains_state(person_id) and person_id not in explored:
                 child = Node(state=person_id, parent=node, action=movie_id)
                 frontier.add(child)
@@ -133,14 +546,25 @@ def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    With a name index loaded, a name with no exact match is resolved
+    among ranked prefix and fuzzy matches instead.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = [graph.person_ids[person]
+                      for person in graph.people_for_name(name)]
+    else:
+        person_ids = list(names.get(name.lower(), set()))
+    suggested = False
+    if len(person_ids) == 0 and name_index is not None:
+        person_ids = name_index.search(name)
+        suggested = True
     if len(person_ids) == 0:
         return None
-    elif len(person_ids) > 1:
+    elif len(person_ids) > 1 or suggested:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_for_id(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -160,6 +584,12 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return (
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index[person_id])
+        )
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -168,5 +598,192 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def bfs_tree(source, targets, neighbors):
+    """
+    Breadth-first search from source that stops once every state in
+    targets has been reached.
+
+    Returns a dict mapping each reached state to the (action, state)
+    it was reached from, with None for source.
+    """
+    parents = {source: None}
+    remaining = set(targets)
+    remaining.discard(source)
+    frontier = [source]
+    while frontier and remaining:
+        next_frontier = []
+        for state in frontier:
+            for action, neighbor in neighbors(state):
+                if neighbor not in parents:
+                    parents[neighbor] = (action, state)
+                    remaining.discard(neighbor)
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return parents
+
+
+def path_in_tree(parents, target):
+    """
+    Returns the (action, state) pairs leading to target in a `bfs_tree`,
+    or None if target was not reached.
+    """
+    if target not in parents:
+        return None
+    solution = []
+    while parents[target] is not None:
+        action, parent = parents[target]
+        solution.append((action, target))
+        target = parent
+    solution.reverse()
+    return solution
+
+
+def paths_from_source(source, targets):
+    """
+    Returns a dict mapping each of targets to its shortest path from
+    source, computed from a single breadth-first tree.
+    """
+    if graph is None:
+        parents = bfs_tree(source, targets, neighbors_for_person)
+        return {target: path_in_tree(parents, target) for target in targets}
+
+    # Unreachable targets would make the tree cover the whole component
+    start = graph.person_index[source]
+    parents = bfs_tree(
+        start,
+        [graph.person_index[target] for target in targets
+         if graph.connected(start, graph.person_index[target]) is not False],
+        graph.neighbors
+    )
+    paths = {}
+    for target in targets:
+        path = path_in_tree(parents, graph.person_index[target])
+        if path is not None:
+            path = [(graph.movie_ids[movie], graph.person_ids[person])
+                    for movie, person in path]
+        paths[target] = path
+    return paths
+
+
+def read_pairs(lines):
+    """
+    Parses lines of tab-separated source and target people, given as
+    IMDB ids or names, skipping blank lines.
+    """
+    pairs = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        source, _, target = line.partition("\t")
+        pairs.append((source.strip(), target.strip()))
+    return pairs
+
+
+def resolve_person(query):
+    """
+    Returns the IMDB id for an IMDB id or an unambiguous name,
+    or None, without prompting.
+    """
+    if graph is not None:
+        if query in graph.person_index:
+            return query
+        person_ids = [graph.person_ids[person]
+                      for person in graph.people_for_name(query)]
+    else:
+        if query in people:
+            return query
+        person_ids = list(names.get(query.lower(), set()))
+    return person_ids[0] if len(person_ids) == 1 else None
+
+
+def answer_group(source, queries):
+    """
+    Answers every (source query, target query) pair in queries, all of
+    which resolve to source, from one breadth-first tree.
+    """
+    targets = [resolve_person(query[1]) for query in queries]
+    paths = paths_from_source(
+        source, {target for target in targets if target is not None}
+    )
+
+    results = []
+    for query, target in zip(queries, targets):
+        result = {"source": query[0], "target": query[1]}
+        if target is None:
+            result["error"] = "person not found or ambiguous"
+        else:
+            path = paths[target]
+            result["source_id"] = source
+            result["target_id"] = target
+            result["degrees"] = None if path is None else len(path)
+            result["path"] = path
+        results.append(result)
+    return results
+
+
+def run_batch(pairs, directory, workers=None, compact=False, snapshot=False,
+              components=False, deltas=(), costars=False):
+    """
+    Answers (source, target) pairs with one breadth-first tree per
+    distinct source, spreading sources across a pool of processes.
+
+    The data must already be loaded with the given options, since
+    sources are resolved here. Workers inherit it under the fork start
+    method, and otherwise each load it again from directory.
+
+    Yields one result dict per pair as each source group finishes.
+    """
+    # Group queries by resolved source
+    groups = {}
+    for source_query, target_query in pairs:
+        source = resolve_person(source_query)
+        if source is None:
+            yield {"source": source_query, "target": target_query,
+                   "error": "person not found or ambiguous"}
+            continue
+        groups.setdefault(source, []).append((source_query, target_query))
+
+    if workers is None or workers <= 1 or len(groups) <= 1:
+        for source, queries in groups.items():
+            yield from answer_group(source, queries)
+        return
+
+    context = multiprocessing.get_context()
+    initializer, initargs = None, ()
+    if context.get_start_method() != "fork":
+        initializer = load_data
+        initargs = (directory, compact, snapshot, components, False, deltas,
+                    costars)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=initializer,
+        initargs=initargs
+    ) as executor:
+        futures = [executor.submit(answer_group, source, queries)
+                   for source, queries in groups.items()]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def person_for_id(person_id):
+    """
+    Returns name, birth and movies of a person from the loaded store.
+    """
+    if graph is not None:
+        return graph.person(person_id)
+    return people[person_id]
+
+
+def movie_for_id(movie_id):
+    """
+    Returns title, year and stars of a movie from the loaded store.
+    """
+    if graph is not None:
+        return graph.movie(movie_id)
+    return movies[movie_id]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,127 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Chris",
+    "Nancy", "Daniel", "Lisa", "Matthew", "Betty", "Anthony", "Margaret",
+    "Mark", "Sandra", "Emma", "Tom", "Kevin", "Sally", "Gary", "Robin"
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
+    "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King",
+    "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green"
+]
+TITLE_WORDS = [
+    "Night", "Return", "Last", "City", "Love", "Dark", "Star", "King",
+    "Road", "Secret", "Lost", "House", "War", "River", "Summer", "Ghost",
+    "Fire", "Dream", "Island", "Storm", "Blue", "Silent", "Wild", "Stone"
+]
+
+# Rows generated between writes, to bound memory at large scales
+CHUNK = 100000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic IMDB-like dataset for degrees.py."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=None,
+                        help="defaults to half of --people")
+    parser.add_argument("--alpha", type=float, default=2.0,
+                        help="power-law exponent of cast sizes")
+    parser.add_argument("--max-cast", type=int, default=200)
+    parser.add_argument("--skew", type=float, default=0.5,
+                        help="power-law exponent of person popularity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    movies = args.movies if args.movies is not None else args.people // 2
+    generate(args.directory, args.people, movies, alpha=args.alpha,
+             max_cast=args.max_cast, skew=args.skew, seed=args.seed)
+
+
+def generate(directory, num_people, num_movies, alpha=2.0, max_cast=200,
+             skew=0.5, seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv to directory.
+
+    Cast sizes follow a discrete power law with exponent alpha, and
+    each cast is drawn with probability proportional to a per-person
+    power-law popularity, so a few people star in many movies and a
+    few movies have large casts, as in the IMDB data.
+
+    Returns the number of stars rows written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    # People, with names drawn from small lists so that some repeat
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for start in range(0, num_people, CHUNK):
+            writer.writerows(
+                (person_id(i),
+                 f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                 rng.randint(1900, 2005))
+                for i in range(start, min(start + CHUNK, num_people))
+            )
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for start in range(0, num_movies, CHUNK):
+            writer.writerows(
+                (movie_id(i),
+                 " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3))),
+                 rng.randint(1920, 2024))
+                for i in range(start, min(start + CHUNK, num_movies))
+            )
+
+    # Zipf-like popularity: the person ranked r is chosen with weight
+    # 1 / r ** skew, after shuffling which person gets which rank
+    ranks = list(range(num_people))
+    rng.shuffle(ranks)
+    cumulative = list(itertools.accumulate(
+        1 / (rank + 1) ** skew for rank in ranks
+    ))
+
+    # Cast sizes by inverse transform sampling of a Pareto distribution
+    rows = 0
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(num_movies):
+            size = int((1 - rng.random()) ** (-1 / (alpha - 1)))
+            size = max(1, min(size, max_cast, num_people))
+            cast = set(rng.choices(range(num_people),
+                                   cum_weights=cumulative, k=size))
+            writer.writerows((person_id(person), movie_id(movie))
+                             for person in cast)
+            rows += len(cast)
+    return rows
+
+
+def person_id(i):
+    return str(i + 1)
+
+
+def movie_id(i):
+    return str(i + 100000000)
+
+
+if __name__ == "__main__":
+    main()
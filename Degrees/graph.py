@@ -0,0 +1,767 @@
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Snapshot file written next to the CSVs, and the layout version it uses
+SNAPSHOT_NAME = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGRSNAP"
+SNAPSHOT_VERSION = 1
+
+# Distance recorded for people a breadth-first search cannot reach
+UNREACHABLE = 255
+
+# Attributes stored in a snapshot, by how they are encoded
+ARRAY_SECTIONS = [
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "name_people"
+]
+OPTIONAL_SECTIONS = [
+    "component", "component_sizes",
+    "costar_offsets", "costar_people", "costar_movies",
+    "costar_all_offsets", "costar_all_movies"
+]
+STRING_SECTIONS = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years", "name_keys"
+]
+
+
+class Graph():
+    """
+    Compact representation of the movie-star graph.
+
+    Person and movie IMDB ids are interned to dense integers, and the
+    person -> movie and movie -> person relations are stored in CSR form:
+    the movies of person p are
+    person_movies[person_offsets[p]:person_offsets[p + 1]], and the stars
+    of movie m are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+    """
+
+    def __init__(self):
+
+        # Interned ids, and per-node attributes indexed by interned id
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # Maps IMDB ids back to interned ids
+        self.person_index = {}
+        self.movie_index = {}
+
+        # CSR adjacency in both directions
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_stars = array("i")
+
+        # Lowercase names sorted, with the person each entry belongs to
+        self.name_keys = []
+        self.name_people = array("i")
+
+        # Connected component label of each person, and size of each
+        # component, once `build_components` has run
+        self.component = None
+        self.component_sizes = None
+
+        # Deduplicated person -> co-star CSR adjacency with one shared
+        # movie per edge, and optionally every shared movie per edge,
+        # once `build_costars` has run
+        self.costar_offsets = None
+        self.costar_people = None
+        self.costar_movies = None
+        self.costar_all_offsets = None
+        self.costar_all_movies = None
+
+        # Memory map backing the arrays when loaded from a snapshot, and
+        # the source fingerprint recorded in it
+        self.snapshot = None
+        self.fingerprint = None
+
+        # Stars and names added by `apply_delta` since the CSR arrays
+        # were built, and a counter bumped by every delta
+        self.extra_movies = {}
+        self.extra_stars = {}
+        self.extra_names = {}
+        self.version = 0
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Build a graph from the people, movies and stars CSV files.
+        """
+        graph = cls()
+
+        # Load people
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row["id"] in graph.person_index:
+                    continue
+                graph.person_index[row["id"]] = len(graph.person_ids)
+                graph.person_ids.append(row["id"])
+                graph.person_names.append(row["name"])
+                graph.person_births.append(row["birth"])
+
+        # Load movies
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row["id"] in graph.movie_index:
+                    continue
+                graph.movie_index[row["id"]] = len(graph.movie_ids)
+                graph.movie_ids.append(row["id"])
+                graph.movie_titles.append(row["title"])
+                graph.movie_years.append(row["year"])
+
+        # Load stars as two parallel edge arrays, skipping unknown ids
+        star_people = array("i")
+        star_movies = array("i")
+        person_index = graph.person_index
+        movie_index = graph.movie_index
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is None or movie is None:
+                    continue
+                star_people.append(person)
+                star_movies.append(movie)
+
+        graph.build(star_people, star_movies)
+        graph.build_name_index()
+        return graph
+
+    @classmethod
+    def from_snapshot(cls, filename, fingerprint=None):
+        """
+        Memory-map a snapshot written by `save_snapshot`.
+
+        Returns None if the file is missing, damaged, was written by
+        another layout version or platform, or does not match
+        `fingerprint`.
+        """
+        try:
+            with open(filename, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            graph = cls.map_snapshot(data, fingerprint)
+        except (ValueError, struct.error, KeyError, TypeError):
+            graph = None
+        if graph is None:
+            data.close()
+        return graph
+
+    @classmethod
+    def map_snapshot(cls, data, fingerprint=None):
+        """
+        Builds a graph over the mapped snapshot data, or returns None if
+        it is for another version, platform or fingerprint. Raises
+        ValueError, struct.error, KeyError or TypeError if it is damaged.
+        """
+        prefix = len(SNAPSHOT_MAGIC) + 8
+        if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            return None
+        version, header_size = struct.unpack(
+            "<II", data[len(SNAPSHOT_MAGIC):prefix]
+        )
+        if version != SNAPSHOT_VERSION:
+            return None
+        header = json.loads(data[prefix:prefix + header_size])
+        if (header["byteorder"] != sys.byteorder
+                or header["itemsize"] != array("i").itemsize
+                or (fingerprint is not None
+                    and header["fingerprint"] != fingerprint)):
+            return None
+
+        # Arrays are zero-copy views into the mapped file
+        graph = cls()
+        graph.snapshot = data
+        graph.fingerprint = header["fingerprint"]
+        view = memoryview(data)
+        start = prefix + header_size
+        for name in ARRAY_SECTIONS + OPTIONAL_SECTIONS:
+            if name not in header["sections"]:
+                continue
+            offset, size = header["sections"][name]
+            offset += start
+            if offset + size > len(data):
+                raise ValueError(f"snapshot section {name} is truncated")
+            setattr(graph, name, view[offset:offset + size].cast("i"))
+        for name in STRING_SECTIONS:
+            offset, size, count = header["sections"][name]
+            offset += start
+            if offset + size > len(data):
+                raise ValueError(f"snapshot section {name} is truncated")
+            strings = str(data[offset:offset + size], "utf-8").split("\0")
+            setattr(graph, name, strings if count else [])
+
+        graph.person_index = dict(
+            zip(graph.person_ids, range(len(graph.person_ids)))
+        )
+        graph.movie_index = dict(
+            zip(graph.movie_ids, range(len(graph.movie_ids)))
+        )
+        return graph
+
+    def save_snapshot(self, filename, fingerprint=None):
+        """
+        Write the graph to filename in the layout `from_snapshot` maps,
+        first folding in anything added by `apply_delta`.
+        """
+        if self.has_delta():
+            self.fold_delta()
+
+        sections = {}
+        chunks = []
+        position = 0
+        for name in ARRAY_SECTIONS + OPTIONAL_SECTIONS + STRING_SECTIONS:
+            values = getattr(self, name)
+            if values is None:
+                continue
+            if name not in STRING_SECTIONS:
+                chunk = array("i", values).tobytes()
+                sections[name] = [position, len(chunk)]
+            else:
+                chunk = "\0".join(values).encode("utf-8")
+                sections[name] = [position, len(chunk), len(values)]
+
+            # Keep every section aligned for the memoryview casts
+            padding = -len(chunk) % 8
+            chunks.append(chunk + bytes(padding))
+            position += len(chunk) + padding
+
+        # Section offsets are relative to the end of the padded header
+        header = {
+            "fingerprint": fingerprint,
+            "byteorder": sys.byteorder,
+            "itemsize": array("i").itemsize,
+            "sections": sections
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        encoded += b" " * (-(len(SNAPSHOT_MAGIC) + 8 + len(encoded)) % 8)
+
+        temporary = f"{filename}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<II", SNAPSHOT_VERSION, len(encoded)))
+            f.write(encoded)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temporary, filename)
+
+    def build(self, star_people, star_movies):
+        """
+        Build both CSR adjacencies from parallel arrays of
+        (person, movie) edges, dropping duplicate edges.
+        """
+        num_people = len(self.person_ids)
+        num_movies = len(self.movie_ids)
+
+        # Person -> movie adjacency, sorted and deduplicated per person
+        offsets, targets = _csr(num_people, star_people, star_movies)
+        person_offsets = array("i", [0])
+        person_movies = array("i")
+        for person in range(num_people):
+            start, end = offsets[person], offsets[person + 1]
+            person_movies.extend(sorted(set(targets[start:end])))
+            person_offsets.append(len(person_movies))
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+
+        # Movie -> person adjacency is the transpose of the above
+        sources = array("i", bytes(4 * len(person_movies)))
+        for person in range(num_people):
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                sources[i] = person
+        self.movie_offsets, self.movie_stars = _csr(
+            num_movies, person_movies, sources
+        )
+
+    def apply_delta(self, records):
+        """
+        Adds the people, movies and stars in records from `read_delta`.
+
+        New stars are kept beside the CSR arrays until `fold_delta`.
+        Component labels are extended for new people. A new star that
+        links two components merges them in place with
+        `join_components`, which walks the smaller one, so the time is
+        proportional to the number of records plus the people relabelled.
+        Since a person is only relabelled when their component at least
+        doubles, that is O(log n) relabels per person over any sequence
+        of deltas. Returns the IMDB ids of people that were added.
+        """
+        if self.component is not None:
+            self.component = array("i", self.component)
+            self.component_sizes = array("i", self.component_sizes)
+        if records:
+            self.drop_costars()
+
+        added = []
+        for kind, fields in records:
+            if kind == "person":
+                person_id, name, birth = fields
+                if person_id in self.person_index:
+                    continue
+                person = len(self.person_ids)
+                self.person_index[person_id] = person
+                self.person_ids.append(person_id)
+                self.person_names.append(name)
+                self.person_births.append(birth)
+                self.extra_names.setdefault(name.lower(), []).append(person)
+                if self.component is not None:
+                    self.component.append(len(self.component_sizes))
+                    self.component_sizes.append(1)
+                added.append(person_id)
+
+            elif kind == "movie":
+                movie_id, title, year = fields
+                if movie_id in self.movie_index:
+                    continue
+                self.movie_index[movie_id] = len(self.movie_ids)
+                self.movie_ids.append(movie_id)
+                self.movie_titles.append(title)
+                self.movie_years.append(year)
+
+            elif kind == "star":
+                person = self.person_index.get(fields[0])
+                movie = self.movie_index.get(fields[1])
+                if person is None or movie is None:
+                    continue
+                if movie in self.movies_for_person(person):
+                    continue
+                stars = self.stars_for_movie(movie)
+                if self.component is not None and len(stars) > 0:
+                    self.join_components(stars[0], person)
+                self.extra_movies.setdefault(person, []).append(movie)
+                self.extra_stars.setdefault(movie, []).append(person)
+
+        self.version += 1
+        return added
+
+    def has_delta(self):
+        """
+        Returns whether anything has been added since the CSR arrays
+        were built.
+        """
+        return (len(self.person_offsets) - 1 != len(self.person_ids)
+                or len(self.movie_offsets) - 1 != len(self.movie_ids)
+                or bool(self.extra_movies))
+
+    def fold_delta(self):
+        """
+        Rebuild the CSR arrays and name index to include everything
+        added by `apply_delta`.
+        """
+        star_people = array("i")
+        star_movies = array("i")
+        for person in range(len(self.person_ids)):
+            for movie in self.movies_for_person(person):
+                star_people.append(person)
+                star_movies.append(movie)
+        self.build(star_people, star_movies)
+        self.build_name_index()
+        self.extra_movies = {}
+        self.extra_stars = {}
+        self.extra_names = {}
+
+    def build_costars(self, keep_all=False):
+        """
+        Build the deduplicated person -> co-star adjacency in one
+        vectorized pass with NumPy.
+
+        Each (person, co-star) edge keeps the lowest shared movie id as
+        its representative; with `keep_all`, every shared movie is kept
+        as well. People are not their own co-stars.
+        """
+        import numpy as np
+
+        if self.has_delta():
+            self.fold_delta()
+        num_people = len(self.person_ids)
+        person_offsets = np.asarray(self.person_offsets, dtype=np.int64)
+        movie_offsets = np.asarray(self.movie_offsets, dtype=np.int64)
+        movie_stars = np.asarray(self.movie_stars, dtype=np.int64)
+
+        # One row per (person, movie) incidence
+        movies = np.asarray(self.person_movies, dtype=np.int64)
+        people = np.repeat(np.arange(num_people), np.diff(person_offsets))
+
+        # Expand each incidence into one row per star of its movie
+        sizes = np.diff(movie_offsets)[movies]
+        total = int(sizes.sum())
+        starts = np.repeat(movie_offsets[movies], sizes)
+        within = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        sources = np.repeat(people, sizes)
+        shared = np.repeat(movies, sizes)
+        targets = movie_stars[starts + within]
+        keep = sources != targets
+        sources, targets, shared = sources[keep], targets[keep], shared[keep]
+
+        # Rows come out ordered by person then movie, so a stable sort by
+        # edge leaves each edge's lowest movie in its first row
+        order = np.argsort(sources * num_people + targets, kind="stable")
+        sources = sources[order]
+        targets = targets[order]
+        shared = shared[order]
+        first = np.ones(len(sources), dtype=bool)
+        first[1:] = ((sources[1:] != sources[:-1])
+                     | (targets[1:] != targets[:-1]))
+
+        offsets = np.zeros(num_people + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[first], minlength=num_people),
+                  out=offsets[1:])
+        self.costar_offsets = to_array(offsets)
+        self.costar_people = to_array(targets[first])
+        self.costar_movies = to_array(shared[first])
+        if keep_all:
+            self.costar_all_offsets = to_array(
+                np.append(np.flatnonzero(first), len(first))
+            )
+            self.costar_all_movies = to_array(shared)
+        else:
+            self.costar_all_offsets = None
+            self.costar_all_movies = None
+
+    def drop_costars(self):
+        self.costar_offsets = None
+        self.costar_people = None
+        self.costar_movies = None
+        self.costar_all_offsets = None
+        self.costar_all_movies = None
+
+    def costars_for_person(self, person):
+        """
+        Returns (co-star, movies) pairs for a person from the co-star
+        adjacency, where movies lists every shared movie if they were
+        kept and the representative movie otherwise.
+        """
+        costars = []
+        for i in range(self.costar_offsets[person],
+                       self.costar_offsets[person + 1]):
+            if self.costar_all_offsets is not None:
+                movies = list(self.costar_all_movies[
+                    self.costar_all_offsets[i]:self.costar_all_offsets[i + 1]
+                ])
+            else:
+                movies = [self.costar_movies[i]]
+            costars.append((self.costar_people[i], movies))
+        return costars
+
+    def build_components(self):
+        """
+        Label every person with a connected component using union-find
+        over the stars relation, numbering components from 0.
+        """
+        parent = array("i", range(len(self.person_ids)))
+
+        def find(person):
+            while parent[person] != person:
+                parent[person] = parent[parent[person]]
+                person = parent[person]
+            return person
+
+        # Every star of a movie joins the component of its first star
+        for movie in range(len(self.movie_ids)):
+            stars = self.stars_for_movie(movie)
+            if len(stars) < 2:
+                continue
+            root = find(stars[0])
+            for star in stars[1:]:
+                other = find(star)
+                if other != root:
+                    parent[other] = root
+
+        labels = {}
+        component = array("i", bytes(4 * len(self.person_ids)))
+        sizes = array("i")
+        for person in range(len(self.person_ids)):
+            root = find(person)
+            if root not in labels:
+                labels[root] = len(sizes)
+                sizes.append(0)
+            component[person] = labels[root]
+            sizes[labels[root]] += 1
+        self.component = component
+        self.component_sizes = sizes
+
+    def join_components(self, a, b):
+        """
+        Merges the components of interned people a and b by relabelling
+        the people in the smaller one, before the star linking them is
+        added, so only that component is walked. The smaller label is
+        left with size 0.
+        """
+        component = self.component
+        sizes = self.component_sizes
+        keep, drop = component[a], component[b]
+        if keep == drop:
+            return
+        if sizes[keep] < sizes[drop]:
+            keep, drop = drop, keep
+            b = a
+        component[b] = keep
+        frontier = [b]
+        while frontier:
+            person = frontier.pop()
+            for movie in self.movies_for_person(person):
+                for star in self.stars_for_movie(movie):
+                    if component[star] == drop:
+                        component[star] = keep
+                        frontier.append(star)
+        sizes[keep] += sizes[drop]
+        sizes[drop] = 0
+
+    def connected(self, a, b):
+        """
+        Returns whether interned people a and b are in the same component,
+        or None if components have not been built.
+        """
+        if self.component is None:
+            return None
+        return self.component[a] == self.component[b]
+
+    def component_stats(self):
+        """
+        Returns a summary of component sizes, or None if components
+        have not been built.
+        """
+        if self.component_sizes is None:
+            return None
+
+        # Components merged by `apply_delta` leave empty labels behind
+        sizes = sorted((size for size in self.component_sizes if size),
+                       reverse=True)
+        people = len(self.person_ids)
+        return {
+            "people": people,
+            "components": len(sizes),
+            "largest": sizes[0] if sizes else 0,
+            "largest_fraction": sizes[0] / people if sizes else 0.0,
+            "singletons": sum(1 for size in sizes if size == 1),
+            "top_sizes": sizes[:10]
+        }
+
+    def build_name_index(self):
+        """
+        Sort lowercase names so lookups can binary search them.
+        """
+        order = sorted(
+            range(len(self.person_names)),
+            key=lambda person: self.person_names[person].lower()
+        )
+        self.name_keys = [self.person_names[person].lower()
+                          for person in order]
+        self.name_people = array("i", order)
+        self.extra_names = {}
+
+    def people_for_name(self, name):
+        """
+        Returns the interned ids of every person with the given name.
+        """
+        key = name.lower()
+        start = bisect_left(self.name_keys, key)
+        end = bisect_right(self.name_keys, key, lo=start)
+        people = list(self.name_people[start:end])
+        return people + self.extra_names.get(key, [])
+
+    def movies_for_person(self, person):
+        if person < len(self.person_offsets) - 1:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        else:
+            movies = []
+        if person in self.extra_movies:
+            return list(movies) + self.extra_movies[person]
+        return movies
+
+    def stars_for_movie(self, movie):
+        if movie < len(self.movie_offsets) - 1:
+            stars = self.movie_stars[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        else:
+            stars = []
+        if movie in self.extra_stars:
+            return list(stars) + self.extra_stars[movie]
+        return stars
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) pairs of interned ids for people
+        who starred with a given person.
+
+        With the co-star adjacency built, each co-star is yielded once,
+        with its representative movie.
+        """
+        if self.costar_offsets is not None:
+            costar_people = self.costar_people
+            costar_movies = self.costar_movies
+            for i in range(self.costar_offsets[person],
+                           self.costar_offsets[person + 1]):
+                yield costar_movies[i], costar_people[i]
+            return
+
+        if self.has_delta():
+            for movie in self.movies_for_person(person):
+                for star in self.stars_for_movie(movie):
+                    yield movie, star
+            return
+
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for i in range(self.person_offsets[person],
+                       self.person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[j]
+
+    def distances(self, source):
+        """
+        Returns an array of person-hop distances from source, capped at
+        UNREACHABLE - 1, with UNREACHABLE for people source cannot reach.
+
+        The search marks movies as it goes, so each cast list is scanned
+        once however many of its stars are on the frontier.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        distance = array("B", [UNREACHABLE]) * len(self.person_ids)
+        seen_movies = bytearray(len(self.movie_ids))
+        distance[source] = 0
+        frontier = [source]
+        depth = 0
+        delta = self.has_delta()
+        while frontier:
+            depth = min(depth + 1, UNREACHABLE - 1)
+            next_frontier = []
+            for person in frontier:
+                if delta:
+                    movies = self.movies_for_person(person)
+                else:
+                    movies = person_movies[person_offsets[person]:
+                                           person_offsets[person + 1]]
+                for movie in movies:
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    if delta:
+                        stars = self.stars_for_movie(movie)
+                    else:
+                        stars = movie_stars[movie_offsets[movie]:
+                                            movie_offsets[movie + 1]]
+                    for star in stars:
+                        if distance[star] == UNREACHABLE:
+                            distance[star] = depth
+                            next_frontier.append(star)
+            frontier = next_frontier
+        return distance
+
+    def person(self, person_id):
+        """
+        Returns the same dictionary `degrees.people` holds for person_id.
+        """
+        person = self.person_index[person_id]
+        return {
+            "name": self.person_names[person],
+            "birth": self.person_births[person],
+            "movies": {self.movie_ids[movie]
+                       for movie in self.movies_for_person(person)}
+        }
+
+    def movie(self, movie_id):
+        """
+        Returns the same dictionary `degrees.movies` holds for movie_id.
+        """
+        movie = self.movie_index[movie_id]
+        return {
+            "title": self.movie_titles[movie],
+            "year": self.movie_years[movie],
+            "stars": {self.person_ids[person]
+                      for person in self.stars_for_movie(movie)}
+        }
+
+
+def read_delta(filename):
+    """
+    Reads a delta file of CSV rows `person,id,name,birth`,
+    `movie,id,title,year` and `star,person_id,movie_id`,
+    returning (kind, fields) records in file order.
+    """
+    fields = {"person": 3, "movie": 3, "star": 2}
+    records = []
+    with open(filename, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0] not in fields:
+                continue
+            kind = row[0]
+            if len(row) - 1 < fields[kind]:
+                continue
+            records.append((kind, row[1:fields[kind] + 1]))
+    return records
+
+
+def delta_fingerprint(filenames):
+    """
+    Returns the path, size and modification time of each delta file.
+    """
+    fingerprint = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        fingerprint.append(
+            [os.path.abspath(filename), stat.st_size, stat.st_mtime_ns]
+        )
+    return fingerprint
+
+
+def csv_fingerprint(directory):
+    """
+    Returns the size and modification time of each source CSV, which a
+    snapshot must match to be reused.
+    """
+    fingerprint = []
+    for name in ["people.csv", "movies.csv", "stars.csv"]:
+        stat = os.stat(os.path.join(directory, name))
+        fingerprint.append([name, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def to_array(values):
+    """
+    Converts a NumPy integer array to a compact `array`.
+    """
+    return array("i", values.astype("=i4").tobytes())
+
+
+def _csr(num_rows, rows, columns):
+    """
+    Counting sort of (row, column) edges into CSR offsets and indices.
+    """
+    offsets = array("i", bytes(4 * (num_rows + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for row in range(num_rows):
+        offsets[row + 1] += offsets[row]
+
+    indices = array("i", bytes(4 * len(columns)))
+    position = array("i", offsets[:-1])
+    for row, column in zip(rows, columns):
+        indices[position[row]] = column
+        position[row] += 1
+    return offsets, indices
@@ -0,0 +1,192 @@
+import heapq
+import json
+import math
+import struct
+from array import array
+
+from graph import UNREACHABLE
+
+# Layout version of files written by `LandmarkIndex.save`
+LANDMARK_MAGIC = b"DEGRLMKS"
+LANDMARK_VERSION = 1
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few well-connected landmark people
+    to everyone in a `Graph`.
+
+    By the triangle inequality, for any landmark L the separation of a
+    and b is at least |d(L, a) - d(L, b)| and at most d(L, a) + d(L, b).
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = array("i", landmarks)
+        self.distances = distances
+
+        # Graph version the distances were computed for
+        self.version = graph.version
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Picks the `count` people with the most co-star appearances as
+        landmarks and runs one breadth-first search from each.
+        """
+        appearances = []
+        for person in range(len(graph.person_ids)):
+            total = 0
+            for movie in graph.movies_for_person(person):
+                total += len(graph.stars_for_movie(movie))
+            appearances.append(total)
+        landmarks = heapq.nlargest(
+            count, range(len(appearances)), key=appearances.__getitem__
+        )
+        return cls(graph, landmarks,
+                   [graph.distances(landmark) for landmark in landmarks])
+
+    @classmethod
+    def load(cls, graph, filename):
+        """
+        Reads an index written by `save`. Returns None if the file is
+        missing or damaged, or was saved for a graph with another
+        fingerprint or number of people.
+        """
+        size = len(graph.person_ids)
+        try:
+            with open(filename, "rb") as f:
+                prefix = len(LANDMARK_MAGIC) + 8
+                data = f.read(prefix)
+                if data[:len(LANDMARK_MAGIC)] != LANDMARK_MAGIC:
+                    return None
+                version, header_size = struct.unpack(
+                    "<II", data[len(LANDMARK_MAGIC):prefix]
+                )
+                if version != LANDMARK_VERSION:
+                    return None
+                header = json.loads(f.read(header_size))
+                if (graph.fingerprint is None
+                        or header["fingerprint"] != graph.fingerprint
+                        or header["people"] != size):
+                    return None
+                landmarks = array("i")
+                landmarks.fromfile(f, header["landmarks"])
+                distances = []
+                for _ in landmarks:
+                    distance = array("B")
+                    distance.fromfile(f, size)
+                    distances.append(distance)
+        except (OSError, EOFError, ValueError, struct.error, KeyError,
+                TypeError):
+            return None
+        return cls(graph, landmarks, distances)
+
+    def check(self):
+        if self.version != self.graph.version:
+            raise Exception("landmark index is stale; rebuild it")
+
+    def save(self, filename):
+        """
+        Writes the index with the fingerprint and number of people of its
+        graph, so `load` can refuse it for any other graph. Only graphs
+        loaded from a snapshot have a fingerprint.
+        """
+        self.check()
+        if self.graph.fingerprint is None:
+            raise Exception("graph has no fingerprint; load it from a snapshot")
+        header = {
+            "fingerprint": self.graph.fingerprint,
+            "people": len(self.graph.person_ids),
+            "landmarks": len(self.landmarks)
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        with open(filename, "wb") as f:
+            f.write(LANDMARK_MAGIC)
+            f.write(struct.pack("<II", LANDMARK_VERSION, len(encoded)))
+            f.write(encoded)
+            self.landmarks.tofile(f)
+            for distance in self.distances:
+                distance.tofile(f)
+
+    def bounds(self, a, b):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        interned people a and b. Both are math.inf if some landmark
+        reaches one but not the other; upper is math.inf if no landmark
+        reaches both.
+        """
+        self.check()
+        lower = 0
+        upper = math.inf
+        for distance in self.distances:
+            da, db = distance[a], distance[b]
+            if da == UNREACHABLE or db == UNREACHABLE:
+                if da != db:
+                    return math.inf, math.inf
+                continue
+            lower = max(lower, abs(da - db))
+            if da < UNREACHABLE - 1 and db < UNREACHABLE - 1:
+                upper = min(upper, da + db)
+        return lower, upper
+
+    def path(self, a, b):
+        """
+        Returns a path of `bounds(a, b)[1]` steps between interned people a
+        and b, as (movie, person) pairs, through the landmark that gives
+        that upper bound, or None if no landmark reaches both.
+        """
+        self.check()
+        best = None
+        for landmark, distance in zip(self.landmarks, self.distances):
+            da, db = distance[a], distance[b]
+            if da < UNREACHABLE - 1 and db < UNREACHABLE - 1:
+                if best is None or da + db < best[0]:
+                    best = (da + db, landmark, distance)
+        if best is None:
+            return None
+        _, landmark, distance = best
+
+        # Each half steps to a co-star one closer to the landmark
+        halves = []
+        for person in [a, b]:
+            half = []
+            while person != landmark:
+                for movie, costar in self.graph.neighbors(person):
+                    if distance[costar] == distance[person] - 1:
+                        half.append((movie, costar))
+                        person = costar
+                        break
+            halves.append(half)
+        to_landmark, from_b = halves
+
+        # Walk the second half backwards, from the landmark to b
+        people = [b] + [person for _, person in from_b]
+        from_landmark = [(movie, people[i])
+                         for i, (movie, _) in reversed(list(enumerate(from_b)))]
+        return to_landmark + from_landmark
+
+    def estimate(self, source_id, target_id):
+        """
+        Returns `bounds` for two people given by IMDB id.
+        """
+        return self.bounds(self.graph.person_index[source_id],
+                           self.graph.person_index[target_id])
+
+    def heuristic(self, target):
+        """
+        Returns an admissible, consistent A* heuristic towards interned
+        person target. People a landmark cannot reach can never reach a
+        target it does reach, so large gaps from them are harmless.
+        """
+        self.check()
+        pairs = [(distance, distance[target]) for distance in self.distances]
+
+        def h(person):
+            best = 0
+            for distance, to_target in pairs:
+                gap = abs(distance[person] - to_target)
+                if gap > best:
+                    best = gap
+            return best
+        return h
@@ -1,84 +1,516 @@
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cached_property
 
-class Node():
-    def __init__(self, state, parent, action):
-        self.state = state
-        self.parent = parent
-        self.action = action
+import numpy as np
 
+from util import Node, PriorityFrontier, QueueFrontier, StackFrontier, timed
 
-class StackFrontier():
-    def __init__(self):
-        self.frontier = []
 
-    def add(self, node):
-        self.frontier.append(node)
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-    def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
 
-    def empty(self):
-        return len(self.frontier) == 0
+def euclidean(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
 
+def chebyshev(a, b):
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
 
-class QueueFrontier(StackFrontier):
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+# Distance estimates between cells, by name; each is admissible for
+# moves up, down, left and right costing at least 1
+HEURISTICS = {
+    "manhattan": manhattan,
+    "euclidean": euclidean,
+    "chebyshev": chebyshev
+}
+
+# Search strategies `Maze.solve` accepts
+STRATEGIES = [
+    "dfs", "bfs", "ucs", "astar", "greedy", "wavefront", "jps", "field"
+]
+
+# Characters of a maze file that are open cells; any other is a wall
+OPEN = " AB123456789"
+
+# Whether each code point is a wall, for decoding a line at a time
+WALL_CODES = np.ones(sys.maxunicode + 1, dtype=bool)
+WALL_CODES[[ord(c) for c in OPEN]] = False
+
+# Binary cache of a maze's packed walls, written next to its text file
+CACHE_SUFFIX = ".bits"
+CACHE_MAGIC = b"MAZEBITS"
+CACHE_VERSION = 1
+
+# Distance fields, written next to the maze file with the source cell
+FIELD_SUFFIX = ".field"
+FIELD_MAGIC = b"MAZEDIST"
+FIELD_VERSION = 1
+
+# Distance field value of cells that cannot be reached
+UNREACHED = -1
+
+# Moves as (action, row step, column step)
+MOVES = [("up", -1, 0), ("down", 1, 0), ("left", 0, -1), ("right", 0, 1)]
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+
+class CellMask():
+    """
+    Set-like view of the cells that are true in a boolean array.
+    """
+
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __contains__(self, cell):
+        return bool(self.mask[cell])
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    def __iter__(self):
+        return (tuple(cell) for cell in np.argwhere(self.mask).tolist())
+
+
+def fingerprint(filename):
+    """
+    Returns the size and modification time of a maze file, which its
+    cache must match to be reused.
+    """
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def map_cache(filename, magic, version, source):
+    """
+    Memory-maps a file written by `write_cache`, returning the mapped
+    data, its header and where the header ends. Returns None if the file
+    is missing, damaged, was written by another layout version, or does
+    not match the source file's size and modification time.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    prefix = len(magic) + 8
+    try:
+        if data[:len(magic)] != magic:
+            raise ValueError("not a cache file")
+        stored, header_size = struct.unpack("<II", data[len(magic):prefix])
+        header = json.loads(data[prefix:prefix + header_size])
+        if (stored != version or not isinstance(header, dict)
+                or header.get("byteorder") != sys.byteorder
+                or header["fingerprint"] != fingerprint(source)):
+            raise ValueError("stale cache file")
+    except (ValueError, struct.error, KeyError, TypeError):
+        data.close()
+        return None
+    return data, header, prefix + header_size
+
+
+def write_cache(filename, magic, version, source, header, chunks):
+    """
+    Writes header and the byte strings in chunks to filename, recording
+    the source file's fingerprint so `map_cache` can tell when it changes.
+    """
+    header = dict(header, fingerprint=fingerprint(source),
+                  byteorder=sys.byteorder)
+    encoded = json.dumps(header).encode("utf-8")
+
+    # Pad the header so that arrays after it are aligned
+    encoded += b" " * (-(len(magic) + 8 + len(encoded)) % 8)
+
+    temporary = f"{filename}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<II", version, len(encoded)))
+        f.write(encoded)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(temporary, filename)
+
+
+class DistanceField():
+    """
+    Number of steps from every cell to a source cell, and for every
+    reached cell, the index in MOVES of a step that is one step nearer.
+
+    Once computed, a shortest path between the source and any cell is
+    found by following `moves`, in time proportional to its length.
+    """
+
+    def __init__(self, source, distances, moves):
+        self.source = source
+        self.distances = distances
+        self.moves = moves
+
+    @classmethod
+    def compute(cls, maze, source):
+        """
+        Runs `Maze.distance_field` from source over the whole maze, then
+        picks a step toward source for every cell in one pass per move.
+        """
+        distances = maze.distance_field(source)
+        padded = np.full((maze.height + 2, maze.width + 2), UNREACHED,
+                         dtype=np.int32)
+        padded[1:-1, 1:-1] = distances
+        moves = np.full(distances.shape, -1, dtype=np.int8)
+        for i, (_, dr, dc) in enumerate(MOVES):
+            nearer = padded[1 + dr:1 + dr + maze.height,
+                            1 + dc:1 + dc + maze.width]
+            moves[(moves == -1) & (distances > 0)
+                  & (nearer == distances - 1)] = i
+        return cls(source, distances, moves)
+
+    @classmethod
+    def load(cls, filename, maze_filename):
+        """
+        Memory-maps a field written by `save`. Returns None if it is
+        missing, damaged or stale.
+        """
+        cache = map_cache(filename, FIELD_MAGIC, FIELD_VERSION, maze_filename)
+        if cache is None:
+            return None
+        data, header, start = cache
+        try:
+            height, width = header["height"], header["width"]
+            distances = np.frombuffer(
+                data, dtype=np.int32, count=height * width, offset=start
+            ).reshape(height, width)
+            moves = np.frombuffer(
+                data, dtype=np.int8, count=height * width,
+                offset=start + distances.nbytes
+            ).reshape(height, width)
+            source = tuple(header["source"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        return cls(source, distances, moves)
+
+    def save(self, filename, maze_filename):
+        header = {
+            "source": self.source,
+            "height": self.distances.shape[0],
+            "width": self.distances.shape[1]
+        }
+        write_cache(filename, FIELD_MAGIC, FIELD_VERSION, maze_filename,
+                    header, [self.distances.tobytes(), self.moves.tobytes()])
+
+    def contains(self, cell):
+        """
+        Returns whether cell lies inside the maze the field covers.
+        """
+        row, col = cell
+        height, width = self.distances.shape
+        return 0 <= row < height and 0 <= col < width
+
+    def distance(self, cell):
+        """
+        Returns the number of steps between cell and the source,
+        or None if they are not connected or cell is outside the maze.
+        """
+        if not self.contains(cell):
+            return None
+        steps = int(self.distances[cell])
+        return None if steps == UNREACHED else steps
+
+    def path_from(self, cell):
+        """
+        Returns the (actions, cells) of a shortest path from cell to the
+        source, or None if they are not connected or cell is outside the
+        maze.
+        """
+        if not self.contains(cell) or self.distances[cell] == UNREACHED:
+            return None
+        actions = []
+        cells = []
+        row, col = cell
+        while self.distances[row, col] > 0:
+            action, dr, dc = MOVES[self.moves[row, col]]
+            row, col = row + dr, col + dc
+            actions.append(action)
+            cells.append((row, col))
+        return actions, cells
+
+    def path_to(self, cell):
+        """
+        Returns the (actions, cells) of a shortest path from the source
+        to cell, or None if they are not connected or cell is outside the
+        maze.
+        """
+        path = self.path_from(cell)
+        if path is None:
+            return None
+        actions, cells = path
+        actions = [OPPOSITE[action] for action in reversed(actions)]
+        cells = [cell] + cells[:-1]
+        cells.reverse()
+        return actions, cells
+
 
 class Maze():
 
-    def __init__(self, filename):
+    def __init__(self, filename, cache=False):
+        """
+        Reads a maze from a text file.
+
+        Walls are kept bit-packed in `bits`, one bit per cell, and the
+        costs of rows containing digits in `weights`. With cache true,
+        they are memory-mapped from a binary cache beside the file when
+        one matches it, and the cache is written otherwise.
+        """
+        self.filename = filename
+        self.fields = {}
+        if not (cache and self.load_cache()):
+            self.read(filename)
+            if cache:
+                self.save_cache()
 
-        # Read file and set height and width of maze
+        self.solution = None
+        self.cost = None
+
+
+    def read(self, filename):
+        """
+        Streams the maze text once, packing each line's walls as it goes.
+        """
+        rows = []
+        self.weights = {}
+        starts = []
+        goals = []
+        self.width = 0
         with open(filename) as f:
-            contents = f.read()
+            for i, line in enumerate(f):
+                line = line.rstrip("\n")
+                self.width = max(self.width, len(line))
+                codes = np.frombuffer(line.encode("utf-32-le"), dtype="<u4")
+                rows.append(np.packbits(WALL_CODES[codes]))
+
+                # Digits 1-9 mark open cells costing that much to enter
+                digits = (codes >= ord("1")) & (codes <= ord("9"))
+                if digits.any():
+                    self.weights[i] = np.where(
+                        digits, codes - ord("0"), 1
+                    ).astype(np.uint8)
+                starts.extend((i, j) for j in np.flatnonzero(codes == ord("A")))
+                goals.extend((i, j) for j in np.flatnonzero(codes == ord("B")))
 
         # Validate start and goal
-        if contents.count("A") != 1:
+        if len(starts) != 1:
             raise Exception("maze must have exactly one start point")
-        if contents.count("B") != 1:
+        if len(goals) != 1:
             raise Exception("maze must have exactly one goal")
-
-        # Determine height and width of maze
-        contents = contents.splitlines()
-        self.height = len(contents)
-        self.width = max(len(line) for line in contents)
-
-        # Keep track of walls
-        self.walls = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                try:
-                    if contents[i][j] == "A":
-                        self.start = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == "B":
-                        self.goal = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == " ":
-                        row.append(False)
-                    else:
-                        row.append(True)
-                except IndexError:
-                    row.append(False)
-            self.walls.append(row)
-
-        self.solution = None
+        self.start = tuple(int(i) for i in starts[0])
+        self.goal = tuple(int(i) for i in goals[0])
+
+        # Short lines are padded with open cells to the full width
+        self.height = len(rows)
+        self.bits = np.zeros((self.height, (self.width + 7) // 8),
+                             dtype=np.uint8)
+        for i, row in enumerate(rows):
+            self.bits[i, :len(row)] = row
+
+
+    def load_cache(self):
+        """
+        Memory-maps the cache written by `save_cache`. Returns False if
+        it is missing, damaged, was written by another layout version, or
+        does not match the maze file's size and modification time.
+        """
+        cache = map_cache(self.filename + CACHE_SUFFIX, CACHE_MAGIC,
+                          CACHE_VERSION, self.filename)
+        if cache is None:
+            return False
+        data, header, start = cache
+
+        # Arrays are zero-copy views into the mapped file, set only once
+        # all of them are read
+        try:
+            height, width = header["height"], header["width"]
+            bits = np.frombuffer(
+                data, dtype=np.uint8, count=height * ((width + 7) // 8),
+                offset=start
+            ).reshape(height, -1)
+            weights = {
+                row: np.frombuffer(data, dtype=np.uint8, count=size,
+                                   offset=start + offset)
+                for row, offset, size in header["weights"]
+            }
+            cells = tuple(header["start"]), tuple(header["goal"])
+        except (ValueError, KeyError, TypeError):
+            return False
+        self.height, self.width = height, width
+        self.start, self.goal = cells
+        self.bits = bits
+        self.weights = weights
+        return True
+
+
+    def save_cache(self):
+        """
+        Writes `bits` and `weights` to the binary cache beside the maze
+        file, in the layout `load_cache` maps.
+        """
+        chunks = [self.bits.tobytes()]
+        position = len(chunks[0])
+        weights = []
+        for row, costs in self.weights.items():
+            weights.append([row, position, len(costs)])
+            chunks.append(costs.tobytes())
+            position += len(costs)
+
+        # Offsets are relative to the end of the header
+        header = {
+            "height": self.height,
+            "width": self.width,
+            "start": self.start,
+            "goal": self.goal,
+            "weights": weights
+        }
+        write_cache(self.filename + CACHE_SUFFIX, CACHE_MAGIC, CACHE_VERSION,
+                    self.filename, header, chunks)
+
+
+    def field(self, source, cache=False):
+        """
+        Returns the `DistanceField` from source, computing it on first use.
+        With cache true, it is also memory-mapped from, or written to, a
+        file beside the maze file.
+
+        Raises ValueError if source is outside the maze or a wall.
+        """
+        source = tuple(source)
+        if source in self.fields:
+            return self.fields[source]
+        row, col = source
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise ValueError(f"source outside maze: {source}")
+        if self.grid[row, col]:
+            raise ValueError(f"source is a wall: {source}")
+        filename = f"{self.filename}.{source[0]}-{source[1]}{FIELD_SUFFIX}"
+        field = DistanceField.load(filename, self.filename) if cache else None
+        if field is None:
+            field = DistanceField.compute(self, source)
+            if cache:
+                field.save(filename, self.filename)
+        self.fields[source] = field
+        return field
+
+
+    def precompute(self, start=False, cache=True):
+        """
+        Computes the field from the goal, and from the start too if start
+        is true, so that later paths are lookups.
+        """
+        self.field(self.goal, cache)
+        if start:
+            self.field(self.start, cache)
+
+
+    def path_from(self, start, cache=False):
+        """
+        Returns the (actions, cells) of a shortest path from start to the
+        goal, or None if there is none, using the field from the goal.
+        """
+        return self.field(self.goal, cache).path_from(start)
+
+
+    @cached_property
+    def grid(self):
+        """
+        Walls as a boolean array, unpacked from `bits`.
+        """
+        return np.unpackbits(self.bits, axis=1, count=self.width).view(bool)
+
+
+    @cached_property
+    def cost_grid(self):
+        """
+        Step costs as an array, filled in from `weights`.
+        """
+        costs = np.ones((self.height, self.width), dtype=np.uint8)
+        for row, weights in self.weights.items():
+            costs[row, :len(weights)] = weights
+        return costs
+
+
+    def path_cost(self, cells):
+        """
+        Returns the total cost of stepping into each of cells.
+        """
+        total = 0
+        for row, col in cells:
+            weights = self.weights.get(row)
+            total += int(weights[col]) if weights is not None and col < len(weights) else 1
+        return total
+
+
+    @cached_property
+    def walls(self):
+        """
+        Walls as a list of rows of bools, for cell-at-a-time access.
+        """
+        return self.grid.tolist()
+
+
+    @cached_property
+    def costs(self):
+        """
+        Step costs as a list of rows of ints, for cell-at-a-time access.
+        """
+        return self.cost_grid.tolist()
+
+
+    def distance_field(self, source, target=None):
+        """
+        Returns an array of the number of steps from source to each cell,
+        with UNREACHED for cells that cannot be reached. Cell costs are
+        ignored.
+
+        The search advances the whole wavefront each step: the frontier is
+        an array of flat cell indices in a grid padded with walls, so its
+        neighbors are the frontier shifted by one row or column. Given a
+        target, it stops after the step that reaches it.
+        """
+        height, width = self.height + 2, self.width + 2
+        open_cells = np.zeros((height, width), dtype=bool)
+        open_cells[1:-1, 1:-1] = ~self.grid
+        open_cells = open_cells.ravel()
+        shifts = np.array([-width, width, -1, 1])
+
+        field = np.full(height * width, UNREACHED, dtype=np.int32)
+        slot = np.empty(height * width, dtype=np.int32)
+        start = (source[0] + 1) * width + source[1] + 1
+        goal = None if target is None else (target[0] + 1) * width + target[1] + 1
+        frontier = np.array([start])
+        field[start] = 0
+        steps = 0
+        while frontier.size:
+            if goal is not None and field[goal] != UNREACHED:
+                break
+            steps += 1
+            candidates = (frontier[:, None] + shifts).ravel()
+            candidates = candidates[open_cells[candidates]
+                                    & (field[candidates] == UNREACHED)]
+
+            # A cell next to several frontier cells appears more than once;
+            # keep the copy whose position is the last one written for it
+            slots = np.arange(candidates.size, dtype=np.int32)
+            slot[candidates] = slots
+            frontier = candidates[slot[candidates] == slots]
+            field[frontier] = steps
+        return field.reshape(height, width)[1:-1, 1:-1]
 
 
     def print(self):
@@ -94,6 +526,8 @@ class Maze():
                     print("B", end="")
                 elif solution is not None and (i, j) in solution:
                     print("*", end="")
+                elif self.costs[i][j] != 1:
+                    print(self.costs[i][j], end="")
                 else:
                     print(" ", end="")
             print()
@@ -116,114 +550,456 @@ class Maze():
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def solve(self, strategy="dfs", heuristic="manhattan", stats=None):
+        """
+        Finds a solution to maze, if one exists.
+
+        strategy is one of `STRATEGIES`: depth-first ("dfs"),
+        breadth-first ("bfs"), vectorized breadth-first ("wavefront") or
+        jump point ("jps") search, or a lookup in the field from the goal
+        ("field"), which ignore cell costs, or
+        uniform-cost ("ucs"), A* ("astar") or greedy best-first
+        ("greedy") search. heuristic is a name from `HEURISTICS` or a
+        function of two cells, used by A* and greedy search.
+
+        Sets `solution`, its total `cost` and `num_explored`, the number
+        of states removed from the frontier and expanded. Given a
+        `SearchStats`, records the search and its phases in it.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy: {strategy}")
+        if strategy == "wavefront":
+            return self.solve_wavefront(stats)
+        if strategy == "jps":
+            return self.solve_jps(stats)
+        if strategy == "field":
+            with timed(stats, "search"):
+                self.solution = self.path_from(self.start)
+            if self.solution is None:
+                raise Exception("no solution")
+            self.num_explored = len(self.solution[1]) + 1
+            self.explored = set(self.solution[1][:-1]) | {self.start}
+            self.cost = self.path_cost(self.solution[1])
+            return
+        estimate = HEURISTICS.get(heuristic, heuristic)
+        goal = self.goal
 
         # Keep track of number of states explored
         self.num_explored = 0
 
-        # Initialize frontier to just the starting position
+        # Initialize frontier to just the starting position; best-first
+        # strategies order it by their key in a heap
         start = Node(state=self.start, parent=None, action=None)
-        frontier = StackFrontier()
+        if strategy == "dfs":
+            frontier = StackFrontier()
+        elif strategy == "bfs":
+            frontier = QueueFrontier()
+        elif strategy == "ucs":
+            frontier = PriorityFrontier(key=lambda node: node.cost)
+        elif strategy == "astar":
+            frontier = PriorityFrontier(
+                key=lambda node: node.cost + estimate(node.state, goal)
+            )
+        else:
+            frontier = PriorityFrontier(
+                key=lambda node: estimate(node.state, goal)
+            )
         frontier.add(start)
 
+        # Uniform-cost and A* search may reach a state again more cheaply,
+        # so they keep the best known cost of each state and skip stale
+        # frontier entries when they are removed; only they need the cost
+        # of each cell
+        reopen = strategy in ["ucs", "astar"]
+        best = {self.start: 0}
+        costs = self.costs if reopen else None
+
         # Initialize an empty explored set
         self.explored = set()
 
         # Keep looping until solution found
-        while True:
-
-            # If nothing left in frontier, then no path
-            if frontier.empty():
-                raise Exception("no solution")
-
-            # Choose a node from the frontier
-            node = frontier.remove()
-            self.num_explored += 1
-
-            # If node is the goal, then we have a solution
-            if node.state == self.goal:
-                actions = []
-                cells = []
-                while node.parent is not None:
-                    actions.append(node.action)
-                    cells.append(node.state)
-                    node = node.parent
-                actions.reverse()
-                cells.reverse()
-                self.solution = (actions, cells)
-                return
-
-            # Mark node as explored
-            self.explored.add(node.state)
-
-            # Add neighbors to frontier
-            for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
-                    child = Node(state=state, parent=node, action=action)
+        with timed(stats, "search"):
+            while True:
+
+                # If nothing left in frontier, then no path
+                if frontier.empty():
+                    raise Exception("no solution")
+
+                # Choose a node from the frontier
+                node = frontier.remove()
+                if reopen:
+                    if stats is not None:
+                        stats.membership_checks += 1
+                    if node.state in self.explored:
+                        continue
+                self.num_explored += 1
+
+                # If node is the goal, then we have a solution
+                if node.state == goal:
+                    break
+
+                # Mark node as explored
+                self.explored.add(node.state)
+                if stats is not None:
+                    stats.expand(node.state, len(frontier))
+
+                # Add neighbors to frontier
+                for action, state in self.neighbors(node.state):
+                    if stats is not None:
+                        stats.membership_checks += 2
+                    if reopen:
+                        cost = node.cost + costs[state[0]][state[1]]
+                        if state in self.explored or cost >= best.get(state, math.inf):
+                            continue
+                        best[state] = cost
+                    elif frontier.contains_state(state) or state in self.explored:
+                        continue
+                    else:
+                        cost = 0
+                    child = Node(state=state, parent=node, action=action, cost=cost)
                     frontier.add(child)
 
-
-    def output_image(self, filename, show_solution=True, show_explored=False):
-        from PIL import Image, ImageDraw
-        cell_size = 50
-        cell_border = 2
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
+        with timed(stats, "reconstruct"):
+            actions = []
+            cells = []
+            while node.parent is not None:
+                actions.append(node.action)
+                cells.append(node.state)
+                node = node.parent
+            actions.reverse()
+            cells.reverse()
+            self.solution = (actions, cells)
+            self.cost = self.path_cost(cells)
+
+
+    def solve_wavefront(self, stats=None):
+        """
+        Finds a shortest solution by number of steps with
+        `distance_field`, then walks back from the goal along it.
+        """
+        with timed(stats, "search"):
+            field = self.distance_field(self.start, self.goal)
+        steps = field[self.goal]
+        if steps == UNREACHED:
+            raise Exception("no solution")
+
+        # Every cell nearer than the goal was expanded, then the goal
+        expanded = (field != UNREACHED) & (field < steps)
+        self.explored = CellMask(expanded)
+        self.num_explored = len(self.explored) + 1
+        if stats is not None:
+            levels = np.bincount(field[field != UNREACHED])
+            stats.nodes_expanded += self.num_explored
+            stats.peak_frontier = max(stats.peak_frontier, int(levels.max()))
+            stats.membership_checks += 2 * len(MOVES) * self.num_explored
+
+        with timed(stats, "reconstruct"):
+            self.solution = self.path_from_field(field, self.goal)
+            self.cost = self.path_cost(self.solution[1])
+
+
+    def path_from_field(self, field, cell):
+        """
+        Returns the (actions, cells) of a shortest path to cell from the
+        source of a distance field, stepping to a cell one step nearer the
+        source each time.
+        """
+        actions = []
+        cells = []
+        row, col = cell
+        while field[row, col] > 0:
+            nearer = field[row, col] - 1
+            for action, dr, dc in MOVES:
+                r, c = row - dr, col - dc
+                if 0 <= r < self.height and 0 <= c < self.width \
+                        and field[r, c] == nearer:
+                    actions.append(action)
+                    cells.append((row, col))
+                    row, col = r, c
+                    break
+        actions.reverse()
+        cells.reverse()
+        return actions, cells
+
+
+    def solve_jps(self, stats=None):
+        """
+        Finds a shortest solution by number of steps with jump point
+        search: A* over only the cells where a straight run from the
+        previous one must stop or turn, so that open areas cost a scan
+        instead of an expansion per cell.
+        """
+        goal = self.goal
+        self.num_explored = 0
+        frontier = PriorityFrontier(
+            key=lambda node: node.cost + manhattan(node.state, goal)
         )
-        draw = ImageDraw.Draw(img)
-
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
-
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
-
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
-
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
-
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
+        frontier.add(Node(state=self.start, parent=None, action=None))
+        best = {self.start: 0}
+        self.explored = set()
 
-                # Empty cell
+        with timed(stats, "search"):
+            while True:
+                if frontier.empty():
+                    raise Exception("no solution")
+                node = frontier.remove()
+                if stats is not None:
+                    stats.membership_checks += 1
+                if node.state in self.explored:
+                    continue
+                self.num_explored += 1
+                if node.state == goal:
+                    break
+                self.explored.add(node.state)
+                if stats is not None:
+                    stats.expand(node.state, len(frontier))
+
+                # Never turn back: keep going, or turn either way
+                if node.action is None:
+                    directions = [(dr, dc) for _, dr, dc in MOVES]
+                elif node.action[0]:
+                    directions = [node.action, (0, -1), (0, 1)]
                 else:
-                    fill = (237, 240, 252)
-
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
-
-        img.save(filename)
-
-
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
\ No newline at end of file
+                    directions = [node.action, (-1, 0), (1, 0)]
+
+                for direction in directions:
+                    point = self.jump(node.state, direction)
+                    if point is None:
+                        continue
+                    if stats is not None:
+                        stats.membership_checks += 2
+                    cost = node.cost + manhattan(node.state, point)
+                    if point in self.explored or cost >= best.get(point, math.inf):
+                        continue
+                    best[point] = cost
+                    frontier.add(Node(state=point, parent=node,
+                                      action=direction, cost=cost))
+
+        # Fill in the straight runs between jump points
+        with timed(stats, "reconstruct"):
+            names = {(dr, dc): action for action, dr, dc in MOVES}
+            actions = []
+            cells = []
+            while node.parent is not None:
+                dr, dc = node.action
+                row, col = node.state
+                for _ in range(manhattan(node.state, node.parent.state)):
+                    actions.append(names[dr, dc])
+                    cells.append((row, col))
+                    row, col = row - dr, col - dc
+                node = node.parent
+            actions.reverse()
+            cells.reverse()
+            self.solution = (actions, cells)
+            self.cost = self.path_cost(cells)
+
+
+    def jump(self, cell, direction):
+        """
+        Moves from cell in direction until reaching a jump point, and
+        returns it, or returns None on hitting a wall first.
+
+        A jump point is the goal, or a cell where a side becomes open
+        that was blocked a step back, so a shortest path may turn there.
+        Running up or down, it is also any cell from which a run left or
+        right reaches a jump point.
+        """
+        dr, dc = direction
+        row, col = cell
+        blocked = self.blocked
+        while True:
+            row += dr
+            col += dc
+            if blocked[row + 1][col + 1]:
+                return None
+            if (row, col) == self.goal:
+                return row, col
+
+            # Rows and columns of blocked are one more than the cell's
+            above, here, below = blocked[row], blocked[row + 1], blocked[row + 2]
+            if dc:
+                if not above[col + 1] and above[col + 1 - dc] \
+                        or not below[col + 1] and below[col + 1 - dc]:
+                    return row, col
+            else:
+                behind = blocked[row + 1 - dr]
+                if not here[col] and behind[col] \
+                        or not here[col + 2] and behind[col + 2]:
+                    return row, col
+                if self.jump((row, col), (0, -1)) is not None \
+                        or self.jump((row, col), (0, 1)) is not None:
+                    return row, col
+
+
+    @cached_property
+    def blocked(self):
+        """
+        Walls as lists of rows with a border of walls around the maze,
+        so cells next to the maze can be looked up without bounds checks.
+        """
+        border = [True] * (self.width + 2)
+        return [border] + [[True] + row + [True] for row in self.walls] + [border]
+
+
+    def render(self, show_solution=True, show_explored=False):
+        """
+        Returns an RGB array with one pixel per cell.
+        """
+        image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+        # Empty cells, then each layer drawn over the ones before it
+        image[:] = (237, 240, 252)
+        if self.solution is not None:
+
+            # Explored
+            if show_explored:
+                if isinstance(self.explored, CellMask):
+                    image[self.explored.mask] = (212, 97, 85)
+                elif self.explored:
+                    image[tuple(np.array(list(self.explored)).T)] = (212, 97, 85)
+
+            # Solution
+            if show_solution and self.solution[1]:
+                image[tuple(np.array(self.solution[1]).T)] = (220, 235, 113)
+
+        # Goal, start and walls
+        image[self.goal] = (0, 171, 28)
+        image[self.start] = (255, 0, 0)
+        image[self.grid] = (40, 40, 40)
+        return image
+
+
+    def output_image(self, filename, show_solution=True, show_explored=False,
+                     cell_size=50, cell_border=2):
+        """
+        Saves the maze as an image with each cell cell_size pixels
+        square, inside a black border cell_border pixels wide.
+        """
+        from PIL import Image
+
+        # Scale up with a single lookup: every pixel names the cell it
+        # shows, or the black row and column appended past the last cell
+        # if it lies in a border
+        image = np.zeros((self.height + 1, self.width + 1, 3), dtype=np.uint8)
+        image[:-1, :-1] = self.render(show_solution, show_explored)
+        pixel_rows = pixel_cells(self.height, cell_size, cell_border)
+        pixel_cols = pixel_cells(self.width, cell_size, cell_border)
+        image = image[pixel_rows[:, None], pixel_cols[None, :]]
+        Image.fromarray(image, "RGB").save(filename)
+
+
+def pixel_cells(count, cell_size, cell_border):
+    """
+    Returns which of count cells each pixel along one axis shows,
+    with count for pixels in a border.
+    """
+    pixels = np.arange(count * cell_size)
+    offsets = pixels % cell_size
+    inside = (offsets >= cell_border) & (offsets <= cell_size - cell_border)
+    return np.where(inside, pixels // cell_size, count)
+
+
+def solve_file(filename, strategy="dfs", heuristic="manhattan", cache=False,
+               image=None):
+    """
+    Solves the maze in filename, saving an image of it if image is a
+    filename. Returns a dict describing the solution or the error.
+    """
+    result = {"maze": filename, "strategy": strategy}
+    try:
+        start = time.perf_counter()
+        maze = Maze(filename, cache=cache)
+        maze.solve(strategy, heuristic)
+        result["seconds"] = time.perf_counter() - start
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    result["steps"] = len(maze.solution[0])
+    result["cost"] = maze.cost
+    result["num_explored"] = maze.num_explored
+    result["actions"] = maze.solution[0]
+    if image is not None:
+        maze.output_image(image, show_explored=True)
+    return result
+
+
+def solve_directory(directory, strategy="dfs", heuristic="manhattan",
+                    workers=None, cache=False, images=None):
+    """
+    Solves every .txt maze in directory across a pool of processes,
+    saving images to the directory images if given.
+
+    Yields one result dict per maze, as each one finishes.
+    """
+    filenames = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(".txt")
+    )
+    if images is not None:
+        os.makedirs(images, exist_ok=True)
+
+    def image_for(filename):
+        if images is None:
+            return None
+        name = os.path.splitext(os.path.basename(filename))[0]
+        return os.path.join(images, name + ".png")
+
+    if workers is not None and workers <= 1:
+        for filename in filenames:
+            yield solve_file(filename, strategy, heuristic, cache,
+                             image_for(filename))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(solve_file, filename, strategy, heuristic,
+                            cache, image_for(filename))
+            for filename in filenames
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("maze", help="maze file, or directory with --batch")
+    parser.add_argument("strategy", nargs="?", default="dfs",
+                        choices=STRATEGIES)
+    parser.add_argument("--heuristic", default="manhattan",
+                        choices=list(HEURISTICS),
+                        help="distance estimate for astar and greedy")
+    parser.add_argument("--cache", action="store_true",
+                        help="memory-map the maze through a binary cache "
+                             "next to its file")
+    parser.add_argument("--image", default="maze.png",
+                        help="where to save the solved maze")
+    parser.add_argument("--batch", action="store_true",
+                        help="solve every .txt maze in a directory and "
+                             "print JSON lines")
+    parser.add_argument("--images", metavar="DIR",
+                        help="save an image of each maze solved by --batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes used by --batch")
+    args = parser.parse_args()
+
+    if args.batch:
+        for result in solve_directory(args.maze, args.strategy,
+                                      args.heuristic, workers=args.workers,
+                                      cache=args.cache, images=args.images):
+            print(json.dumps(result), flush=True)
+        return
+
+    m = Maze(args.maze, cache=args.cache)
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(args.strategy, args.heuristic)
+    print("States Explored:", m.num_explored)
+    print("Cost:", m.cost)
+    print("Solution:")
+    m.print()
+    m.output_image(args.image, show_explored=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import heapq
+import itertools
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Length of the n-grams fuzzy search looks names up by
+GRAM = 3
+
+
+class NameIndex():
+    """
+    Sorted index of lowercase names supporting exact, prefix and
+    bounded edit-distance lookups.
+
+    Each distinct name is stored once in `keys`, with the values
+    (person ids) that carry it in `values`. Fuzzy search uses postings
+    from every n-gram of a padded name to the names containing it.
+    """
+
+    def __init__(self, entries):
+        """
+        Builds the index from (name, value) pairs.
+        """
+        postings = {}
+        for name, value in entries:
+            postings.setdefault(name.lower(), []).append(value)
+        self.keys = sorted(postings)
+        self.values = [postings[key] for key in self.keys]
+
+        grams = {}
+        for i, key in enumerate(self.keys):
+            for gram in set(ngrams(key)):
+                grams.setdefault(gram, []).append(i)
+        self.grams = {gram: array("i", keys) for gram, keys in grams.items()}
+
+        # Names added after the index was built
+        self.added = {}
+
+    def add(self, name, value):
+        """
+        Adds one (name, value) pair. Names not already in `keys` are kept
+        in `added` and scanned, so adding costs nothing per indexed name.
+        """
+        key = name.lower()
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            self.values[i].append(value)
+        else:
+            self.added.setdefault(key, []).append(value)
+
+    def lookup(self, key):
+        """
+        Returns the values for a lowercase key.
+        """
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return self.added.get(key, [])
+
+    def exact(self, name):
+        """
+        Returns the values for exactly name, ignoring case.
+        """
+        return list(self.lookup(name.lower()))
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns names starting with prefix, shortest first.
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_right(self.keys, prefix + "\U0010ffff", lo=start)
+        matches = itertools.chain(
+            itertools.islice(self.keys, start, end),
+            (key for key in self.added if key.startswith(prefix))
+        )
+        if limit is None:
+            return sorted(matches, key=len)
+        return heapq.nsmallest(limit, matches, key=len)
+
+    def fuzzy(self, name, max_distance=2, limit=None):
+        """
+        Returns (distance, name) pairs for names within max_distance
+        edits of name, closest first.
+        """
+        key = name.lower()
+
+        # A name within k edits shares all but at most k * GRAM of the
+        # query's n-grams, so it must appear in one of the rarest
+        # len(rarest) - threshold + 1 postings lists
+        rarest = sorted(
+            set(ngrams(key)), key=lambda gram: len(self.grams.get(gram, ()))
+        )
+        threshold = max(len(rarest) - max_distance * GRAM, 1)
+        candidates = set()
+        for gram in rarest[:len(rarest) - threshold + 1]:
+            candidates.update(self.grams.get(gram, ()))
+
+        matches = []
+        for other in itertools.chain(
+            (self.keys[i] for i in candidates), self.added
+        ):
+            distance = edit_distance(key, other, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, other))
+        matches.sort()
+        return matches[:limit]
+
+    def search(self, name, limit=10, max_distance=2):
+        """
+        Returns up to limit values ranked by how well their name matches:
+        exact matches, then names starting with name, then names within
+        max_distance edits of it.
+        """
+        ranked = []
+        seen = set()
+
+        def extend(values):
+            for value in values:
+                if value not in seen:
+                    seen.add(value)
+                    ranked.append(value)
+
+        extend(self.exact(name))
+        for key in self.prefix(name, limit):
+            extend(self.lookup(key))
+        if len(ranked) < limit:
+            for _, key in self.fuzzy(name, max_distance, limit):
+                extend(self.lookup(key))
+        return ranked[:limit]
+
+
+def ngrams(key):
+    """
+    Returns the n-grams of key padded with spaces at both ends.
+    """
+    padded = " " * (GRAM - 1) + key + " " * (GRAM - 1)
+    return [padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)]
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between a and b,
+    or limit + 1 as soon as it is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (x != y)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+class PathCache():
+    """
+    Least-recently-used cache of shortest paths by (source, target).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.paths = OrderedDict()
+
+    def get(self, key):
+        if key not in self.paths:
+            return None, False
+        self.paths.move_to_end(key)
+        return self.paths[key], True
+
+    def put(self, key, path):
+        if self.size <= 0:
+            return
+        self.paths[key] = path
+        self.paths.move_to_end(key)
+        if len(self.paths) > self.size:
+            self.paths.popitem(last=False)
+
+
+class DegreesServer():
+    """
+    Answers line-delimited JSON requests over TCP against a dataset
+    that is loaded once.
+
+    Each request is an object with an "op" of "path" (with "source" and
+    "target"), "neighbors" (with "person") or "search" (with "name" and
+    an optional "limit"). People are given as IMDB ids or unambiguous
+    names. Each response echoes the request's "id" and has "ok" set,
+    with either the result fields or an "error".
+
+    Requests are answered in a pool of `workers` processes, as many as
+    there are CPUs by default, or in threads if `workers` is 0.
+    """
+
+    def __init__(self, directory, host="127.0.0.1", port=0, workers=None,
+                 cache_size=1024, **load_options):
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.load_options = load_options
+        self.cache = PathCache(cache_size)
+        self.executor = None
+        self.server = None
+
+    async def start(self):
+        """
+        Loads the data, starts the worker pool and begins listening.
+        Returns the (host, port) the server is bound to.
+        """
+        degrees.load_data(self.directory, **self.load_options)
+
+        # Requests run in processes that load the same data; with no
+        # workers they run in the event loop's default thread pool
+        if self.workers != 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=load_worker,
+                initargs=(self.directory, self.load_options)
+            )
+
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port
+        )
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            # Wait for the workers without blocking connections that are
+            # still finishing
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.executor.shutdown)
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line):
+        """
+        Returns the response object for one request line.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "invalid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "request must be an object"}
+
+        response = {"id": request.get("id")}
+        try:
+            op = request.get("op")
+            if op == "path":
+                response.update(await self.path(request))
+            elif op == "neighbors":
+                response.update(await self.run(neighbors, request))
+            elif op == "search":
+                response.update(await self.run(search, request))
+            else:
+                raise RequestError(f"unknown op {op!r}")
+        except RequestError as e:
+            response["ok"] = False
+            response["error"] = str(e)
+            return response
+        except Exception as e:
+            # Anything else, such as a broken worker pool, still gets a
+            # response rather than dropping the connection
+            response["ok"] = False
+            response["error"] = f"internal error: {type(e).__name__}: {e}"
+            return response
+        response["ok"] = True
+        return response
+
+    async def path(self, request):
+        source = resolve(request.get("source"))
+        target = resolve(request.get("target"))
+        key = (source, target)
+        path, cached = self.cache.get(key)
+        if not cached:
+            path = await self.run(degrees.shortest_path, source, target)
+            self.cache.put(key, path)
+        return {
+            "source_id": source,
+            "target_id": target,
+            "degrees": None if path is None else len(path),
+            "path": path,
+            "cached": cached
+        }
+
+    async def run(self, function, *args):
+        """
+        Calls function with args in the executor and returns its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+
+class RequestError(Exception):
+    pass
+
+
+def load_worker(directory, load_options):
+    degrees.load_data(directory, **load_options)
+
+
+def resolve(query):
+    """
+    Returns the IMDB id a request names, or raises RequestError.
+    """
+    if not isinstance(query, str):
+        raise RequestError("person must be a string")
+    person_id = degrees.resolve_person(query)
+    if person_id is None:
+        raise RequestError(f"person not found or ambiguous: {query}")
+    return person_id
+
+
+def neighbors(request):
+    person_id = resolve(request.get("person"))
+    return {
+        "person_id": person_id,
+        "neighbors": sorted(degrees.neighbors_for_person(person_id))
+    }
+
+
+def search(request):
+    name = request.get("name")
+    if not isinstance(name, str):
+        raise RequestError("name must be a string")
+    limit = request.get("limit", 10)
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise RequestError("limit must be a positive integer")
+    if degrees.name_index is not None:
+        person_ids = degrees.name_index.search(name, limit=limit)
+    elif degrees.graph is not None:
+        person_ids = [degrees.graph.person_ids[person]
+                      for person in degrees.graph.people_for_name(name)]
+    else:
+        person_ids = sorted(degrees.names.get(name.lower(), set()))
+    people = []
+    for person_id in person_ids[:limit]:
+        person = degrees.person_for_id(person_id)
+        people.append({
+            "id": person_id,
+            "name": person["name"],
+            "birth": person["birth"]
+        })
+    return {"people": people}
+
+
+async def query(host, port, requests):
+    """
+    Sends requests to a running server over one connection
+    and returns the responses in order.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    responses = []
+    try:
+        for request in requests:
+            writer.write(json.dumps(request).encode("utf-8") + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return responses
+
+
+async def serve(args):
+    server = DegreesServer(
+        args.directory, host=args.host, port=args.port,
+        workers=args.workers, cache_size=args.cache_size,
+        compact=args.compact, snapshot=args.snapshot,
+        components=args.components, name_search=args.name_search
+    )
+    host, port = await server.start()
+    print(f"Serving on {host}:{port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes for path searches (0 uses threads)")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="number of recent paths to remember")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--snapshot", action="store_true")
+    parser.add_argument("--components", action="store_true")
+    parser.add_argument("--name-search", action="store_true")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import degrees
+import generate
+from server import DegreesServer, query
+
+
+class ServerTest(unittest.TestCase):
+    """
+    Runs a `DegreesServer` on localhost over a small generated dataset
+    and talks to it over TCP, as a client would.
+
+    Run from this directory with `python -m unittest test_server`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        generate.generate(cls.directory.name, 300, 150, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        """
+        Forgets the data `degrees.load_data` loaded, which it keeps in
+        module globals, so each test loads its own store.
+        """
+        degrees.graph = None
+        degrees.name_index = None
+        degrees.names.clear()
+        degrees.people.clear()
+        degrees.movies.clear()
+
+    def serve(self, requests, workers=None, raw=False, **load_options):
+        """
+        Starts a server, sends requests over one connection and returns
+        the responses. With raw, requests are lines sent as they are.
+        """
+        async def run():
+            server = DegreesServer(self.directory.name, port=0,
+                                   workers=workers, cache_size=16,
+                                   **load_options)
+            host, port = await server.start()
+            try:
+                if not raw:
+                    return await query(host, port, requests)
+                reader, writer = await asyncio.open_connection(host, port)
+                responses = []
+                for line in requests:
+                    writer.write(line + b"\n")
+                    await writer.drain()
+                    responses.append(json.loads(await reader.readline()))
+                writer.close()
+                await writer.wait_closed()
+                return responses
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def check_paths(self, workers, **load_options):
+        pairs = [("1", "2"), ("3", "40"), ("5", "5"), ("1", "2")]
+        responses = self.serve([
+            {"id": i, "op": "path", "source": source, "target": target}
+            for i, (source, target) in enumerate(pairs)
+        ], workers=workers, **load_options)
+
+        for i, ((source, target), response) in enumerate(
+                zip(pairs, responses)):
+            self.assertEqual(response["id"], i)
+            self.assertTrue(response["ok"], response)
+            self.assertEqual(response["source_id"], source)
+            self.assertEqual(response["target_id"], target)
+
+            # The server loaded the same data into this process
+            expected = degrees.shortest_path(source, target)
+            if expected is None:
+                self.assertIsNone(response["path"])
+                self.assertIsNone(response["degrees"])
+            else:
+                self.assertEqual(response["degrees"], len(expected))
+                self.assertEqual(len(response["path"]), len(expected))
+        self.assertEqual([response["cached"] for response in responses],
+                         [False, False, False, True])
+
+    def test_path_in_processes(self):
+        self.check_paths(workers=2)
+
+    def test_path_in_threads(self):
+        self.check_paths(workers=0, compact=True)
+
+    def check_neighbors_and_search(self, workers, **load_options):
+        responses = self.serve([
+            {"id": "n", "op": "neighbors", "person": "1"},
+            {"id": "s", "op": "search", "name": "", "limit": 3}
+        ], workers=workers, **load_options)
+        neighbors, _ = responses
+        self.assertTrue(neighbors["ok"], neighbors)
+        self.assertEqual(
+            [tuple(pair) for pair in neighbors["neighbors"]],
+            sorted(degrees.neighbors_for_person("1"))
+        )
+
+        name = degrees.person_for_id("1")["name"]
+        search, = self.serve([{"op": "search", "name": name}],
+                             workers=workers, **load_options)
+        self.assertTrue(search["ok"], search)
+        self.assertIn("1", [person["id"] for person in search["people"]])
+        for person in search["people"]:
+            self.assertEqual(person["name"], name)
+
+    def test_neighbors_and_search(self):
+        self.check_neighbors_and_search(workers=0)
+
+    def test_neighbors_and_search_in_processes(self):
+        self.check_neighbors_and_search(workers=2, compact=True)
+
+    def test_bad_requests(self):
+        requests = [
+            {"id": 1, "op": "fly"},
+            {"id": 2, "op": "path", "source": "1", "target": "missing"},
+            {"id": 3, "op": "path", "source": 1, "target": "2"},
+            {"id": 4, "op": "search", "name": "x", "limit": True},
+            {"id": 5, "op": "search", "name": "x", "limit": 0},
+            {"id": 6, "op": "search", "name": None},
+            {"id": 7, "op": "neighbors"}
+        ]
+        responses = self.serve(requests, workers=0)
+        for request, response in zip(requests, responses):
+            self.assertEqual(response["id"], request["id"])
+            self.assertFalse(response["ok"], response)
+            self.assertIn("error", response)
+
+        responses = self.serve([b"{not json", b"[1, 2]"], workers=0,
+                               raw=True)
+        self.assertEqual(responses, [
+            {"ok": False, "error": "invalid JSON"},
+            {"ok": False, "error": "request must be an object"}
+        ])
+
+    def test_internal_error_keeps_connection(self):
+        with mock.patch.object(degrees, "shortest_path",
+                               side_effect=KeyError("boom")):
+            failed, neighbors = self.serve([
+                {"id": 1, "op": "path", "source": "1", "target": "2"},
+                {"id": 2, "op": "neighbors", "person": "1"}
+            ], workers=0)
+        self.assertEqual(failed["id"], 1)
+        self.assertFalse(failed["ok"])
+        self.assertIn("KeyError", failed["error"])
+        self.assertTrue(neighbors["ok"], neighbors)
+
+
+if __name__ == "__main__":
+    unittest.main()
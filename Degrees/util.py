@@ -1,19 +1,37 @@
+import heapq
+import itertools
+import json
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
+    """
+    Last-in first-out frontier.
+
+    Alongside the nodes it keeps a count of how many nodes hold each
+    state, so `contains_state` is a hash lookup instead of a scan.
+    """
+
     def __init__(self):
         self.frontier = []
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,17 +40,122 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self.discard_state(node.state)
             return node
 
+    def discard_state(self, state):
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
+        else:
+            self.states[state] = count - 1
+
+    def __len__(self):
+        return len(self.frontier)
+
 
 class QueueFrontier(StackFrontier):
+    """
+    First-in first-out frontier backed by a deque.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frontier = deque()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.discard_state(node.state)
+            return node
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier that always removes the node with the lowest `key(node)`,
+    breaking ties in insertion order.
+    """
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(self.frontier, (self.key(node), next(self.counter), node))
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = heapq.heappop(self.frontier)[2]
+            self.discard_state(node.state)
             return node
+
+
+class SearchStats():
+    """
+    Counts what a search does: nodes expanded, the largest frontier,
+    membership checks against the frontier and explored sets, and time
+    spent in each named phase.
+
+    Searches take an optional stats object and skip all bookkeeping when
+    it is None. If `trace` is a writable file, every expansion and phase
+    is also written to it as a JSON line.
+    """
+
+    def __init__(self, trace=None):
+        self.nodes_expanded = 0
+        self.peak_frontier = 0
+        self.membership_checks = 0
+        self.phases = {}
+        self.trace = trace
+
+    def expand(self, state, frontier_size):
+        """
+        Records that state was expanded with frontier_size nodes waiting.
+        """
+        self.nodes_expanded += 1
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+        if self.trace is not None:
+            self.write({"event": "expand", "state": state,
+                        "frontier": frontier_size})
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block, adding to any earlier time for name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self.trace is not None:
+                self.write({"event": "phase", "phase": name,
+                            "seconds": elapsed})
+
+    def as_dict(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "peak_frontier": self.peak_frontier,
+            "membership_checks": self.membership_checks,
+            "phases": dict(self.phases)
+        }
+
+    def write(self, record):
+        self.trace.write(json.dumps(record, default=str) + "\n")
+
+
+def timed(stats, name):
+    """
+    Returns `stats.phase(name)`, or a context that does nothing when
+    stats is None.
+    """
+    return nullcontext() if stats is None else stats.phase(name)
@@ -1,19 +1,178 @@
 import itertools
+import weakref
+
+from sat import Solver
+
+# Ways `model_check` can decide entailment
+BACKENDS = ["solver", "enumerate", "compiled", "truth-table"]
+
+# Symbols whose models the truth-table backend packs into one block
+BLOCK_SYMBOLS = 20
+
+# Levels of sentence that `Sentence.compile` nests in one expression,
+# well within what Python can parse
+COMPILE_DEPTH = 50
+
+# What `model_check_all` can find out about each query
+ENTAILED = "entailed"
+REFUTED = "refuted"
+UNKNOWN = "unknown"
 
 
 class Sentence:
+    """
+    Sentences that cannot change are hash-consed: constructing one equal
+    to one that exists returns the existing instance, and its hash and
+    the names of its symbols are computed once, when it is created.
+
+    `And.add` changes an And in place, so an And, and any sentence built
+    on one, is never shared and works out its hash and symbols whenever
+    they are needed; its `_hash` and `_symbols` are None.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Whether sentences of the class can change after they are built
+    mutable = False
+
+    # Every live sentence that cannot change, by its class and parts
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, *parts):
+        if cls.mutable or any(isinstance(part, Sentence)
+                              and part._hash is None for part in parts):
+            sentence = super().__new__(cls)
+            sentence.build(*parts)
+            sentence._hash = sentence._symbols = None
+            return sentence
+        key = (cls, *parts)
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = super().__new__(cls)
+            sentence.build(*parts)
+            sentence._hash = hash(key)
+            Sentence.interned[key] = sentence
+        return sentence
+
+    def build(self, *parts):
+        """Sets up a new sentence from its parts."""
+        self._symbols = ()
+
+    def parts(self):
+        """Returns what the sentence was constructed from."""
+        return ()
+
+    def __eq__(self, other):
+        return self is other or (
+            type(self) is type(other)
+            and hash(self) == hash(other)
+            and self.parts() == other.parts()
+        )
+
+    def __hash__(self):
+        if self._hash is None:
+            return hash((type(self), *self.parts()))
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), self.parts())
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        out, by Kleene's three-valued logic: returns True or False if every
+        way of assigning the missing symbols gives that value as far as
+        the connectives can tell, and None otherwise.
+        """
+        raise Exception("nothing to evaluate")
+
+    def evaluate_bits(self, bits):
+        """
+        Evaluates the logical sentence in many models at once. bits maps
+        each symbol to an integer array holding one bit per model, and the
+        result holds the sentence's value in each model the same way.
+        """
+        raise Exception("nothing to evaluate")
+
+    def compile(self, symbols=None):
+        """
+        Returns a function that evaluates the logical sentence in a model
+        given as a tuple of truth values, one for each name in symbols,
+        by default the sentence's symbols in sorted order.
+
+        The function is generated from Python expressions, so it
+        short-circuits like `evaluate` without walking the sentence.
+        Python limits how deeply an expression can nest, so every part
+        of the sentence COMPILE_DEPTH levels tall is first assigned to a
+        local variable, which the expressions above it use instead.
+        """
+        if symbols is None:
+            symbols = sorted(self.symbols())
+        index = {name: i for i, name in enumerate(symbols)}
+        names = {}
+        heights = {}
+        lines = []
+
+        def visit(sentence):
+            """Returns how many levels of sentence are left to nest."""
+            key = id(sentence)
+            if key not in heights:
+                height = 1
+                for part in sentence.parts():
+                    if isinstance(part, Sentence):
+                        height = max(height, visit(part) + 1)
+                if height >= COMPILE_DEPTH:
+                    name = f"part{len(names)}"
+                    lines.append(
+                        f"{name} = {sentence.expression(index, names)}"
+                    )
+                    names[key] = name
+                    height = 0
+                heights[key] = height
+            return heights[key]
+
+        visit(self)
+        lines.append(f"return {self.source(index, names)}")
+        namespace = {}
+        exec("def sentence(model):\n"
+             + "".join(f"    {line}\n" for line in lines), namespace)
+        function = namespace["sentence"]
+        function.symbols = list(symbols)
+        return function
+
+    def source(self, index, names):
+        """
+        Returns Python source evaluating the logical sentence: the name of
+        the local variable holding its value if names maps its id to one,
+        and otherwise its expression.
+        """
+        return names.get(id(self)) or self.expression(index, names)
+
+    def expression(self, index, names):
+        """
+        Returns a Python expression evaluating the logical sentence, where
+        index maps each symbol to its position in a tuple named model and
+        names maps the ids of parts already evaluated to local variables.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        if self._symbols is None:
+            names = set()
+            for part in self.parts():
+                names.update(part.symbols() if part._symbols is None
+                             else part._symbols)
+            return names
+        return set(self._symbols)
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +202,14 @@ class Sentence:
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
+    def build(self, name):
         self.name = name
+        self._symbols = (name,)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def parts(self):
+        return (self.name,)
 
     def __repr__(self):
         return self.name
@@ -62,23 +220,36 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
+    def evaluate_bits(self, bits):
+        try:
+            return bits[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def expression(self, index, names):
+        try:
+            return f"model[{index[self.name]}]"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def build(self, operand):
         Sentence.validate(operand)
         self.operand = operand
+        self._symbols = operand._symbols
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def parts(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +257,31 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
+    def evaluate_bits(self, bits):
+        return ~self.operand.evaluate_bits(bits)
+
+    def expression(self, index, names):
+        return f"(not {self.operand.source(index, names)})"
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+    mutable = True
+
+    def build(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def parts(self):
+        return tuple(self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -120,29 +296,49 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def evaluate_bits(self, bits):
+        if not self.conjuncts:
+            return ~(next(iter(bits.values())) & 0)
+        result = self.conjuncts[0].evaluate_bits(bits)
+        for conjunct in self.conjuncts[1:]:
+            result = result & conjunct.evaluate_bits(bits)
+        return result
+
+    def expression(self, index, names):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.source(index, names) for conjunct in self.conjuncts
+        ) + ")"
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def build(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
+        self._symbols = union(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def parts(self):
+        return tuple(self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +347,50 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def evaluate_bits(self, bits):
+        if not self.disjuncts:
+            return next(iter(bits.values())) & 0
+        result = self.disjuncts[0].evaluate_bits(bits)
+        for disjunct in self.disjuncts[1:]:
+            result = result | disjunct.evaluate_bits(bits)
+        return result
+
+    def expression(self, index, names):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.source(index, names) for disjunct in self.disjuncts
+        ) + ")"
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def build(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
+        self._symbols = union([antecedent, consequent])
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def parts(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +399,44 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True:
+            return consequent
+        return None
+
+    def evaluate_bits(self, bits):
+        return (~self.antecedent.evaluate_bits(bits)
+                | self.consequent.evaluate_bits(bits))
+
+    def expression(self, index, names):
+        antecedent = self.antecedent.source(index, names)
+        consequent = self.consequent.source(index, names)
+        return f"(not {antecedent} or {consequent})"
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def build(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
+        self._symbols = union([left, right])
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def parts(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,33 +447,302 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def evaluate_bits(self, bits):
+        return ~(self.left.evaluate_bits(bits)
+                 ^ self.right.evaluate_bits(bits))
+
+    def expression(self, index, names):
+        left = self.left.source(index, names)
+        right = self.right.source(index, names)
+        return f"({left} == {right})"
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
 
+def union(sentences):
+    """
+    Returns the names of the symbols in any of sentences, as a tuple,
+    reusing a sentence's own tuple when it already has all of them.
+    Returns None if any of sentences can change.
+    """
+    if any(sentence._symbols is None for sentence in sentences):
+        return None
+    names = set().union(*[sentence._symbols for sentence in sentences])
+    for sentence in sentences:
+        if len(sentence._symbols) == len(names):
+            return sentence._symbols
+    return tuple(names)
+
+
+class CNF:
+    """
+    Clauses for a `Solver` equivalent to sentences, by the Tseitin
+    encoding: every symbol and every distinct compound subsentence gets a
+    variable, with clauses making it equal to its parts. The clauses grow
+    linearly with the sentences, where distributing Or over And would
+    grow exponentially.
+    """
+
+    def __init__(self):
+        self.solver = Solver()
+        self.variables = {}
+        self.literals = {}
+        self.true = None
+
+    def variable(self, name):
+        """Returns the variable for the symbol called name."""
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_var()
+        return self.variables[name]
+
+    def add(self, sentence):
+        """Adds clauses requiring sentence to be true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when sentence is."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        solver = self.solver
+        if isinstance(sentence, (And, Or)):
+            parts = [self.literal(part) for part in (
+                sentence.conjuncts if isinstance(sentence, And)
+                else sentence.disjuncts
+            )]
+
+            # An Or is the negation of an And of negated parts
+            sign = 1 if isinstance(sentence, And) else -1
+            parts = [sign * part for part in parts]
+            if not parts:
+                literal = self.constant()
+            else:
+                literal = solver.new_var()
+                for part in parts:
+                    solver.add_clause([-literal, part])
+                solver.add_clause([literal] + [-part for part in parts])
+            literal *= sign
+        elif isinstance(sentence, Implication):
+            literal = self.literal(
+                Or(Not(sentence.antecedent), sentence.consequent)
+            )
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = solver.new_var()
+            solver.add_clause([-literal, -left, right])
+            solver.add_clause([-literal, left, -right])
+            solver.add_clause([literal, left, right])
+            solver.add_clause([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        self.literals[sentence] = literal
+        return literal
+
+    def constant(self):
+        """Returns a literal that is always true."""
+        if self.true is None:
+            self.true = self.solver.new_var()
+            self.solver.add_clause([self.true])
+        return self.true
+
+    def satisfiable(self, *sentences):
+        """Checks if the clauses can hold with every one of sentences."""
+        return self.solver.solve([self.literal(sentence)
+                                  for sentence in sentences])
+
+    def entails(self, query):
+        """Checks if the clauses entail query."""
+        return not self.satisfiable(Not(query))
+
+    def classify(self, queries):
+        """
+        Returns whether the clauses entail or refute each of queries, or
+        neither. Every model the solver finds shows which value each
+        query can take, so most of them never need a call of their own.
+        """
+        literals = [self.literal(query) for query in queries]
+        possible = [set() for _ in queries]
+
+        def witness():
+            for literal, values in zip(literals, possible):
+                values.add(self.solver.model[abs(literal)] == (literal > 0))
+
+        if not self.solver.solve():
+            return [ENTAILED] * len(queries)
+        witness()
+        for literal, values in zip(literals, possible):
+            for value in [True, False]:
+                if value not in values and self.solver.solve(
+                    [literal if value else -literal]
+                ):
+                    witness()
+        return [verdict(values) for values in possible]
+
+
+def model_check(knowledge, query, backend="solver"):
+    """
+    Checks if knowledge base entails query.
+
+    The "solver" backend checks that knowledge and not query cannot both
+    hold, with a SAT solver over their clauses; "enumerate" checks query
+    in the models of the symbols, skipping those that partial models
+    already decide, "compiled" checks every model with both sentences
+    compiled to one function, and "truth-table" whole blocks of models at
+    a time.
+    """
+    if backend == "enumerate":
+        return check_models(knowledge, query)
+    if backend == "compiled":
+        return check_compiled(knowledge, query)
+    if backend == "truth-table":
+        return check_truth_table(knowledge, query)
+    if backend != "solver":
+        raise ValueError(f"unknown backend: {backend}")
+    cnf = CNF()
+    cnf.add(knowledge)
+    return cnf.entails(query)
+
+
+def model_check_all(knowledge, queries, backend="solver"):
+    """
+    Checks every one of queries against knowledge base at once. Returns a
+    list with, for each query, ENTAILED if knowledge entails it, REFUTED
+    if knowledge entails its negation, and UNKNOWN otherwise; a knowledge
+    base with no models entails everything.
+
+    The "solver" backend solves one set of clauses for all queries and
+    "enumerate" enumerates the models once. The other backends check
+    each query and its negation separately.
+    """
+    queries = list(queries)
+    if backend == "solver":
+        cnf = CNF()
+        cnf.add(knowledge)
+        return cnf.classify(queries)
+    if backend == "enumerate":
+        return classify_models(knowledge, queries)
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    results = []
+    for query in queries:
+        if model_check(knowledge, query, backend):
+            results.append(ENTAILED)
+        elif model_check(knowledge, Not(query), backend):
+            results.append(REFUTED)
+        else:
+            results.append(UNKNOWN)
+    return results
+
+
+def classify_models(knowledge, queries):
+    """
+    Classifies each of queries by the values it takes in the models of
+    knowledge base. Like `check_models`, it builds models up from partial
+    ones and stops extending a model once nothing more can be learned
+    from it.
+    """
+    counts = {}
+    occurrences(knowledge, counts)
+    for query in queries:
+        occurrences(query, counts)
+    symbols = sorted(counts, key=lambda name: (-counts[name], name))
+    possible = [set() for _ in queries]
+
+    def visit(model, depth):
+        """Records the values queries take in models extending model."""
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return
+
+        # A query decided in a model of knowledge base keeps its value in
+        # every model extending it; one that has taken both values is done
+        pending = False
+        for query, seen in zip(queries, possible):
+            if len(seen) < 2:
+                value = query.evaluate_partial(model)
+                if known is True and value is not None:
+                    seen.add(value)
+                else:
+                    pending = True
+        if not pending:
+            return
+
+        p = symbols[depth]
+        for value in [True, False]:
+            model[p] = value
+            visit(model, depth + 1)
+        del model[p]
+
+    visit(dict(), 0)
+    return [verdict(values) for values in possible]
+
+
+def verdict(values):
+    """Classifies a query by the set of values it can take."""
+    if False not in values:
+        return ENTAILED
+    if True not in values:
+        return REFUTED
+    return UNKNOWN
+
+
+def check_models(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating models.
+
+    Models are built up one symbol at a time, and both sentences are
+    evaluated in each partial model so that no model is extended once
+    knowledge is false in it or query is decided. The symbols that occur
+    most often are assigned first, since they decide the most.
+    """
 
     def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+        """Checks if knowledge base entails query, given a partial model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
+        # If knowledge base is false whatever the remaining symbols are,
+        # no model extending this one matters
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return True
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # If query is already decided, so is entailment. Once model has an
+        # assignment for each symbol, both are decided
+        answer = query.evaluate_partial(model)
+        if answer is True:
             return True
+        if answer is False and known is True:
+            return False
         else:
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+            # Choose the most frequent of the remaining unused symbols
+            remaining = symbols[1:]
+            p = symbols[0]
 
             # Create a model where the symbol is true
             model_true = model.copy()
@@ -256,8 +756,84 @@ def model_check(knowledge, query):
             return (check_all(knowledge, query, remaining, model_true) and
                     check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    # Get all symbols in both knowledge and query, most frequent first
+    counts = {}
+    occurrences(knowledge, counts)
+    occurrences(query, counts)
+    symbols = sorted(counts, key=lambda name: (-counts[name], name))
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def occurrences(sentence, counts):
+    """Adds how many times each symbol occurs in sentence to counts."""
+    if isinstance(sentence, Symbol):
+        counts[sentence.name] = counts.get(sentence.name, 0) + 1
+    else:
+        for part in sentence.parts():
+            occurrences(part, counts)
+
+
+def check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating models as
+    tuples and evaluating one compiled function in each.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    entailed = Implication(knowledge, query).compile(symbols)
+    return all(map(entailed, itertools.product([True, False],
+                                               repeat=len(symbols))))
+
+
+def check_truth_table(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both in blocks
+    of models at once, with NumPy bitwise operations on packed bits.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if not symbols:
+        # Nothing to size the blocks by; there is only the empty model
+        return check_models(knowledge, query)
+    inner = symbols[:BLOCK_SYMBOLS]
+    outer = symbols[BLOCK_SYMBOLS:]
+
+    # The inner symbols take every combination of values within a block,
+    # and the outer ones are the same throughout a block
+    columns, mask = truth_table(len(inner))
+    zeros = mask & 0
+    ones = ~zeros
+    for values in itertools.product([False, True], repeat=len(outer)):
+        bits = dict(zip(inner, columns))
+        bits.update(
+            (name, ones if value else zeros)
+            for name, value in zip(outer, values)
+        )
+        if ((knowledge.evaluate_bits(bits)
+             & ~query.evaluate_bits(bits) & mask).any()):
+            return False
+    return True
+
+
+def truth_table(count):
+    """
+    Returns the columns of a truth table over count symbols, as arrays
+    of 64-bit words holding one bit per row, and a mask of the bits in
+    use when there are fewer than 64 rows.
+    """
+    import numpy as np
+
+    rows = 2 ** count
+    words = np.arange(max(rows // 64, 1), dtype=np.uint64)
+    mask = np.full(words.shape, (1 << min(rows, 64)) - 1, dtype=np.uint64)
+    columns = []
+    for i in range(count):
+        if i < 6:
+            # Bit j of every word is row j's value
+            word = sum(1 << j for j in range(64) if j >> i & 1)
+            columns.append(np.full(words.shape, word, dtype=np.uint64))
+        else:
+            # Whole words alternate in runs of 2 ** (i - 6)
+            columns.append(np.where(words >> np.uint64(i - 6) & np.uint64(1),
+                                    np.uint64(2 ** 64 - 1), np.uint64(0)))
+    return columns, mask
@@ -81,8 +81,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            results = model_check_all(knowledge, symbols)
+            for symbol, result in zip(symbols, results):
+                if result == ENTAILED:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,300 @@
+import heapq
+
+
+class Solver:
+    """
+    Conflict-driven clause learning SAT solver.
+
+    Variables are positive integers from `new_var`, and a literal is a
+    variable or its negation. Each clause watches two of its literals and
+    is only visited when one of them becomes false. Conflicts are analyzed
+    back to the first unique implication point, learning a clause and
+    jumping back to the level where it becomes unit.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []
+
+        # Per literal: the clauses watching it, and whether it is true
+        self.watches = {}
+        self.truth = {}
+
+        # Per variable, indexed from 1: value, decision level, the clause
+        # that implied it, branching activity and last value held
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.order = []
+        self.increment = 1.0
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+
+    def new_var(self):
+        """Adds a variable and returns it."""
+        self.num_vars += 1
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        for literal in [self.num_vars, -self.num_vars]:
+            self.watches[literal] = []
+            self.truth[literal] = None
+        heapq.heappush(self.order, (0.0, self.num_vars))
+        return self.num_vars
+
+    def value(self, literal):
+        """Returns whether literal is true, or None if it is unassigned."""
+        return self.truth[literal]
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, a list of literals at least one of which is true.
+        Returns False if the clauses are now unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+
+        # Drop duplicates and literals already false; skip tautologies
+        # and clauses already satisfied
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value is True or -literal in clause:
+                return True
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns whether the clauses are satisfiable with every literal in
+        assumptions true. If they are, `model` maps each variable to its
+        value in a satisfying assignment.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        restart = 100
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                self.increment /= 0.95
+                restart -= 1
+                continue
+
+            # Restart now and then, keeping learned clauses and activity
+            if restart <= 0:
+                restart = 100 + self.conflicts // 2
+                self.backtrack(0)
+                continue
+
+            # Decide assumptions first, one level each
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value is None:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.pick()
+            if variable is None:
+                self.model = {
+                    variable: self.values[variable]
+                    for variable in range(1, self.num_vars + 1)
+                }
+                self.backtrack(0)
+                return True
+            self.trail_limits.append(len(self.trail))
+            self.assign(variable if self.phases[variable] else -variable,
+                        None)
+
+    def attach(self, clause):
+        """Stores a clause, watching its first two literals."""
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.truth[literal] = True
+        self.truth[-literal] = False
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal that some clause forces, returning the index
+        of a clause with every literal false, or None.
+        """
+        truth = self.truth
+        watches = self.watches
+        clauses = self.clauses
+        trail = self.trail
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            watches[false] = kept = []
+            for i, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if truth[first]:
+                    kept.append(index)
+                    continue
+
+                # Watch another literal that is not false, if there is one
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if truth[other] is not False:
+                        clause[1], clause[k] = other, false
+                        watches[other].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if truth[first] is False:
+                        kept.extend(watching[i + 1:])
+                        return index
+                    self.assign(first, index)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Resolves the conflict clause with the reasons for its literals
+        assigned at the current level until only one is left. Returns the
+        learned clause, with that literal negated first, and the level to
+        jump back to.
+        """
+        level = len(self.trail_limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Next literal on the trail that is part of the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learned[0] = -literal
+
+        # Drop literals whose reason is made of the others
+        variables = {abs(other) for other in learned}
+        learned = [learned[0]] + [
+            other for other in learned[1:]
+            if not self.implied(other, variables)
+        ]
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal that becomes false last as the second one
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def implied(self, literal, variables):
+        """
+        Checks if literal is false because of literals of variables
+        and assignments made before any decision.
+        """
+        reason = self.reasons[abs(literal)]
+        if reason is None:
+            return False
+        return all(other == -literal or abs(other) in variables
+                   or self.levels[abs(other)] == 0
+                   for other in self.clauses[reason])
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v)
+                          for v in range(1, self.num_vars + 1)]
+            heapq.heapify(self.order)
+        else:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def pick(self):
+        """Returns the unassigned variable with the most activity, or None."""
+        while self.order:
+            variable = heapq.heappop(self.order)[1]
+            if self.values[variable] is None:
+                return variable
+        return None
+
+    def backtrack(self, level):
+        """Undoes every assignment made above level."""
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = None
+            self.truth[literal] = self.truth[-literal] = None
+            self.reasons[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)